@@ -1,12 +1,19 @@
 import sys
 import streamlit as st
-import pickle
-import pandas as pd
-import time
 import os
 import sys
+import time
+import uuid
+import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
-from utilis.feature_preprocessing import preprocess_input
+from utilis.artifact import load_serving_engine, serving_version
+from utilis.prediction_cache import PredictionCache
+from utilis.micro_batch import MicroBatcher
+from utilis.timing import get_recorder
+from utilis.what_if import WEIGHT_RANGE, AP_HI_RANGE, scenarios, score_scenarios
+from utilis.feature_preprocessing import RAW_FIELDS, preprocess_batch
+from utilis.explain import base_value, contributions, group_contributions, FEATURE_GROUPS
+from utilis.prediction_store import PredictionStore, version_label
 
 
 #-----------Configurazione pagina------------
@@ -28,21 +35,39 @@ with st.sidebar:
         st.switch_page("pages/2_Grafici.py")
     if st.button("🧍Confronto paziente"):
         st.switch_page("pages/3_Confronto.py")
+    st.write("")
+    show_timings = st.toggle("⏱️ Debug latenze", value=False)
 
 
 #-----------Caricamento modello ML e SCALER------------
-@st.cache_resource # per evitare ricaricamenti multipli
-def load_model():
-    with open("model/model.pkl", "rb") as f:
-        return pickle.load(f)
+@st.cache_resource # per evitare ricaricamenti multipli (ricarica se cambiano gli artefatti)
+def load_model(version):
+    # scaler e modello fusi in un unico motore NumPy: model/model.npz se presente
+    # (nessun import di sklearn) se esportato dai pickle attuali, altrimenti model.pkl + scaler.pkl
+    engine, _ = load_serving_engine()
+    return engine
+
+@st.cache_resource # cache LRU delle predizioni, condivisa da tutte le sessioni
+def load_prediction_cache():
+    return PredictionCache()
+
+# scheduler di micro-batch condiviso: una sola istanza viva, chiusa al cambio di modello
+@st.cache_resource(max_entries=1, on_release=lambda batcher: batcher.close())
+def load_batcher(version):
+    return MicroBatcher(load_model(version))
 
-@st.cache_resource # per evitare ricaricamenti multipli
-def load_scaler():
-    with open("model/scaler.pkl", "rb") as f:
-        return pickle.load(f)
+SCORE_TIMEOUT_S = 5 # attesa massima del batcher: mai bloccare la sessione a tempo indeterminato
 
-model = load_model()
-scaler = load_scaler()
+@st.cache_resource(on_release=lambda store: store.close()) # storico SQLite, un solo scrittore per processo
+def load_store():
+    return PredictionStore()
+
+version = serving_version()
+batcher = load_batcher(version)
+prediction_cache = load_prediction_cache()
+recorder = get_recorder("predizione")
+store = load_store()
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
 
 
 #-----------Titolo------------
@@ -53,160 +78,201 @@ st.markdown("Inserisci i tuoi dati per ottenere una stima personalizzata del ris
 st.write("")
 st.write("")
 
-# SEZIONE ANAGRAFICA
-with st.container():
-    st.subheader("👤 Informazioni Personali")
+# Tutti gli input in un form: modificare un campo non riesegue la pagina,
+# un solo rerun alla conferma con "Calcola rischio"
+with st.form("dati_paziente", border=False):
 
-    col1, col2, col3 = st.columns(3)
+    # SEZIONE ANAGRAFICA
+    with st.container():
+        st.subheader("👤 Informazioni Personali")
 
-    with col1:
-        age = st.slider("Età", 18, 100, 50)
+        col1, col2, col3 = st.columns(3)
 
-    with col2:
-        height = st.slider("Altezza (cm)", 120, 220, 170)
+        with col1:
+            age = st.slider("Età", 18, 100, 50)
 
-    with col3:
-        weight = st.slider("Peso (kg)", 40, 200, 70)
+        with col2:
+            height = st.slider("Altezza (cm)", 120, 220, 170)
 
+        with col3:
+            weight = st.slider("Peso (kg)", 40, 200, 70)
 
 
-st.write("")
-st.write("")
 
+    st.write("")
+    st.write("")
 
-#PRESSIONE ARTERIOSA
-with st.container():
-    st.subheader("🫀 Pressione Arteriosa")
 
-    col1, col2 = st.columns(2)
+    #PRESSIONE ARTERIOSA
+    with st.container():
+        st.subheader("🫀 Pressione Arteriosa")
 
-    with col1:
-        ap_hi = st.number_input(
-            "Pressione sistolica (ap_hi)",
-            min_value=80, max_value=250, value=120,
-            help='mmHg'
-        )
+        col1, col2 = st.columns(2)
 
-    with col2:
-        ap_lo = st.number_input(
-            "Pressione diastolica (ap_lo)",
-            min_value=40, max_value=150, value=80,
-            help='mmHg'
-        )
+        with col1:
+            ap_hi = st.number_input(
+                "Pressione sistolica (ap_hi)",
+                min_value=80, max_value=250, value=120,
+                help='mmHg'
+            )
 
+        with col2:
+            ap_lo = st.number_input(
+                "Pressione diastolica (ap_lo)",
+                min_value=40, max_value=150, value=80,
+                help='mmHg'
+            )
 
-st.write("")
-st.write("")
 
+    st.write("")
+    st.write("")
 
-#GENERE
-with st.container():
-    st.subheader("🚻 Genere")
 
-    gender = st.radio(
-        "Seleziona il genere",
-        options=[1, 2],
-        format_func=lambda x: "👩 Donna" if x == 1 else "👨 Uomo",
-        horizontal=True
-    )
+    #GENERE
+    with st.container():
+        st.subheader("🚻 Genere")
 
+        gender = st.radio(
+            "Seleziona il genere",
+            options=[1, 2],
+            format_func=lambda x: "👩 Donna" if x == 1 else "👨 Uomo",
+            horizontal=True
+        )
 
-st.write("")
-st.write("")
 
+    st.write("")
+    st.write("")
 
-#VALORI CLINICI
-with st.container():
-    st.subheader("🧪 Valori Clinici")
 
-    col1, col2 = st.columns(2)
+    #VALORI CLINICI
+    with st.container():
+        st.subheader("🧪 Valori Clinici")
 
-    with col1:
-        cholesterol = st.radio(
-            "Livello colesterolo",
-            options=[1, 2, 3],
-            horizontal=True,
-            help="1: normale, 2: sopra la norma, 3: molto alto"
-        )
+        col1, col2 = st.columns(2)
 
-    with col2:
-        gluc = st.radio(
-            "Livello glucosio",
-            options=[1, 2, 3],
-            horizontal=True,
-            help="1: normale, 2: sopra la norma, 3: molto alto"
-        )
+        with col1:
+            cholesterol = st.radio(
+                "Livello colesterolo",
+                options=[1, 2, 3],
+                horizontal=True,
+                help="1: normale, 2: sopra la norma, 3: molto alto"
+            )
 
+        with col2:
+            gluc = st.radio(
+                "Livello glucosio",
+                options=[1, 2, 3],
+                horizontal=True,
+                help="1: normale, 2: sopra la norma, 3: molto alto"
+            )
 
-st.write("")
-st.write("")
 
+    st.write("")
+    st.write("")
 
-#STILE DI VITA
-with st.container():
-    st.subheader("🏃 Stile di Vita")
 
-    col1, col2, col3 = st.columns(3)
+    #STILE DI VITA
+    with st.container():
+        st.subheader("🏃 Stile di Vita")
 
-    with col1:
-        smoke = st.radio(
-            "Fumatore",
-            options=[0, 1],
-            format_func=lambda x: "Sì" if x == 1 else "No",
-            horizontal=True
-        )
+        col1, col2, col3 = st.columns(3)
 
-    with col2:
-        alco = st.radio(
-            "Consumo di alcol",
-            options=[0, 1],
-            format_func=lambda x: "Sì" if x == 1 else "No",
-            horizontal=True
-        )
+        with col1:
+            smoke = st.radio(
+                "Fumatore",
+                options=[0, 1],
+                format_func=lambda x: "Sì" if x == 1 else "No",
+                horizontal=True
+            )
 
-    with col3:
-        active = st.radio(
-            "Attività fisica",
-            options=[0, 1],
-            format_func=lambda x: "Sì" if x == 1 else "No",
-            horizontal=True
-        )
+        with col2:
+            alco = st.radio(
+                "Consumo di alcol",
+                options=[0, 1],
+                format_func=lambda x: "Sì" if x == 1 else "No",
+                horizontal=True
+            )
 
+        with col3:
+            active = st.radio(
+                "Attività fisica",
+                options=[0, 1],
+                format_func=lambda x: "Sì" if x == 1 else "No",
+                horizontal=True
+            )
 
-st.write("")
-st.write("")
 
+    st.write("")
+    st.write("")
 
+    submitted = st.form_submit_button("Calcola rischio")
 
-#  PREDIZIONE
-if st.button("Calcola rischio"):
 
-    #Simulo attesa
-    with st.spinner("Sto calcolando il rischio..."):
-        time.sleep(3)
+#  PREDIZIONE
+if submitted:
 
+    timer = recorder.start()
+    key = (age, height, weight, ap_hi, ap_lo, gender, cholesterol, gluc, smoke, alco, active)
 
-    #Preprocessing
-    X = preprocess_input(
-        age, height, weight, ap_hi, ap_lo,
-        gender, cholesterol, gluc, smoke, alco, active
-    )
+    #Stage in sequenza e senza sovrapposizioni: la loro somma è il totale
+    #Combinazioni già viste: niente predict
+    with timer.stage("lookup"):
+        cached = prediction_cache.get(key, version)
+    cache_hit = cached is not None
 
-    #Scaling
-    X_scaled = scaler.transform(X)
+    #Preprocessing (serve anche alla spiegazione, quindi sempre)
+    with timer.stage("preprocess"):
+        X = preprocess_batch(as_array=True, **dict(zip(RAW_FIELDS, key)))
 
-    #Predizione
-    proba = model.predict_proba(X_scaled)[0][1]
-    pred = model.predict(X_scaled)[0]
+    #Scaling + Predizione, in batch con le richieste delle altre sessioni
+    if cache_hit:
+        proba, pred = cached
+    else:
+        with timer.stage("predict"):
+            proba, pred = batcher.score(X[0], timeout=SCORE_TIMEOUT_S)
+        prediction_cache.put(key, (proba, pred), version)
 
     #Output
-    st.subheader("🎯 Risultato della Predizione")
-    st.write(f"**Probabilità stimata di rischio cardiaco: {proba:.2%}**")
-
-    if pred == 1:
-        st.error("🔴 **Alto rischio**")
-    else:
-        st.success("🟢 **Basso rischio**")
+    with timer.stage("render"):
+        st.subheader("🎯 Risultato della Predizione")
+        st.write(f"**Probabilità stimata di rischio cardiaco: {proba:.2%}**")
+
+        if pred == 1:
+            st.error("🔴 **Alto rischio**")
+        else:
+            st.success("🟢 **Basso rischio**")
+
+    #Perché: contributi al logit per campo, rispetto al paziente medio del training
+    with timer.stage("explain"):
+        import plotly.graph_objects as go
+
+        engine = load_model(version)
+        contrib = group_contributions(contributions(engine, X)[0], engine.features)
+
+        nomi = {
+            "age": "Età", "height": "Altezza", "weight": "Peso", "ap_hi": "Pressione sistolica",
+            "ap_lo": "Pressione diastolica", "smoke": "Fumo", "alco": "Alcol", "active": "Attività fisica",
+            "gender": "Genere", "cholesterol": "Colesterolo", "gluc": "Glucosio", "BMI": "BMI",
+        }
+        order = np.argsort(np.abs(contrib))
+        fig = go.Figure(go.Bar(
+            x=contrib[order], y=[nomi[g] for g in np.array(list(FEATURE_GROUPS))[order]], orientation="h",
+            marker_color=["#d0021b" if c > 0 else "#7ed321" for c in contrib[order]],
+        ))
+        fig.update_layout(title="Perché questo risultato", xaxis_title="Contributo al logit del rischio",
+                          height=420, margin=dict(l=10, r=10))
+
+        with st.expander("🔍 Perché questo risultato?", expanded=True):
+            st.plotly_chart(fig, width="stretch")
+            base = 1 / (1 + np.exp(-base_value(engine)))
+            st.caption(f"Punto di partenza: rischio del paziente medio {base:.1%}. Le barre rosse aumentano "
+                       f"il rischio, quelle verdi lo riducono; la somma porta a {proba:.1%}.")
+
+    timings = timer.finish(proba=round(proba, 4), pred=pred, cache_hit=cache_hit)
+
+    #Storico: solo accodato, la scrittura avviene sul thread dello store (latenza end-to-end)
+    store.record(session_id, key, proba, pred, version_label(version),
+                 timings["total"] * 1000, cache_hit)
 
     #Salvataggio per confronti futuri
     st.session_state["last_values"] = {
@@ -275,4 +341,126 @@ if "last_values" in st.session_state:
         st.switch_page("pages/3_Confronto.py")
 
 
+#-----------What-if: come cambia il rischio------------
+@st.fragment # la risoluzione delle griglie riesegue solo questa sezione
+def what_if_section(d):
+    import plotly.graph_objects as go
+
+    st.subheader("🔀 Cosa succede se...")
+    st.markdown("Come cambierebbe il rischio stimato modificando peso, pressione, colesterolo o fumo "
+                "(tutti gli altri valori restano quelli inseriti).")
+
+    col1, col2 = st.columns(2)
+    n_weight = col1.slider("Valori di peso nella griglia", 20, 400, 200, step=10)
+    n_ap_hi = col2.slider("Valori di pressione sistolica nella griglia", 20, 300, 150, step=10)
+
+    weights = np.linspace(*WEIGHT_RANGE, n_weight)
+    ap_his = np.linspace(*AP_HI_RANGE, n_ap_hi)
+    levels = {"cholesterol": [1, 2, 3], "smoke": [0, 1]}
+
+    # Heatmap peso × pressione e curve per colesterolo/fumo: un solo passaggio del motore
+    grids = (
+        scenarios(d, weight=weights, ap_hi=ap_his),
+        scenarios(d, **levels, weight=weights),
+        scenarios(d, **levels, ap_hi=ap_his),
+    )
+    t = time.perf_counter()
+    heatmap, by_weight, by_ap_hi = score_scenarios(load_model(version), *grids)
+    elapsed = time.perf_counter() - t
+    recorder.record("what_if", elapsed)
+
+    n_scenarios = sum(int(np.prod(shape)) for _, shape in grids)
+    st.caption(f"Griglia {n_weight} × {n_ap_hi} più {n_scenarios - n_weight * n_ap_hi} punti delle curve: "
+               f"{n_scenarios:,} scenari valutati in un solo passaggio in {elapsed * 1000:.1f} ms")
+
+    livelli = {1: "normale", 2: "sopra la norma", 3: "molto alto"}
+    colori = {1: "#4a90e2", 2: "#f5a623", 3: "#d0021b"}
+
+    def curves(x, risk, xaxis_title, value):
+        fig = go.Figure()
+        for i, chol in enumerate(levels["cholesterol"]):
+            for j, smoke in enumerate(levels["smoke"]):
+                fig.add_scatter(x=x, y=risk[i, j] * 100, mode="lines",
+                                line=dict(color=colori[chol], dash="dash" if smoke else "solid"),
+                                name=f"Colesterolo {livelli[chol]}" + (", fumatore" if smoke else ""))
+        fig.add_scatter(x=[value], y=[d["predicted_risk"] * 100], mode="markers",
+                        marker=dict(size=14, color="black"), name="Tu")
+        fig.update_layout(xaxis_title=xaxis_title, yaxis_title="Rischio stimato (%)", yaxis_range=[0, 100])
+        return fig
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(curves(weights, by_weight, "Peso (kg)", d["weight"]), width="stretch")
+    with col2:
+        st.plotly_chart(curves(ap_his, by_ap_hi, "Pressione sistolica (mmHg)", d["ap_hi"]), width="stretch")
+
+    fig = go.Figure(go.Heatmap(x=weights, y=ap_his, z=heatmap.T * 100, colorscale="RdYlGn_r",
+                               zmin=0, zmax=100, colorbar=dict(title="Rischio %")))
+    fig.add_scatter(x=[d["weight"]], y=[d["ap_hi"]], mode="markers",
+                    marker=dict(size=14, color="black", symbol="x"), name="Tu")
+    fig.update_layout(title="Rischio stimato per peso e pressione sistolica",
+                      xaxis_title="Peso (kg)", yaxis_title="Pressione sistolica (mmHg)")
+    st.plotly_chart(fig, width="stretch")
+
+if "last_values" in st.session_state:
+    what_if_section(st.session_state["last_values"])
+
+
+#-----------Storico delle predizioni della sessione------------
+history = store.history(session_id)
+if history:
+    with st.expander(f"🕘 Storico delle predizioni di questa sessione ({len(history)})"):
+        st.dataframe({
+            "Ora": [time.strftime("%H:%M:%S", time.localtime(r["ts"])) for r in history],
+            "Età": [int(r["age"]) for r in history],
+            "Peso": [r["weight"] for r in history],
+            "Pressione": [f"{r['ap_hi']:.0f}/{r['ap_lo']:.0f}" for r in history],
+            "Colesterolo": [int(r["cholesterol"]) for r in history],
+            "Fumo": ["Sì" if r["smoke"] else "No" for r in history],
+            "Rischio": [f"{r['proba']:.1%}" for r in history],
+            "Classe": ["Alto" if r["pred"] else "Basso" for r in history],
+        }, hide_index=True)
+        st.caption("Le predizioni vengono salvate in background: l'ultima può comparire al passaggio successivo.")
+
+
+#-----------Pannello di debug: latenze per stage------------
+if show_timings:
+    with st.expander("⏱️ Latenze per stage (ms, finestra mobile)", expanded=True):
+        summary = recorder.summary()
+        if summary:
+            st.table({
+                "Stage": list(summary),
+                "Richieste": [r["count"] for r in summary.values()],
+                "p50": [f"{r['p50']:.3f}" for r in summary.values()],
+                "p95": [f"{r['p95']:.3f}" for r in summary.values()],
+                "p99": [f"{r['p99']:.3f}" for r in summary.values()],
+            })
+        else:
+            st.write("Nessuna predizione registrata.")
+
+        cache_stats = prediction_cache.stats()
+        st.caption(
+            f"Cache predizioni: {cache_stats['size']}/{cache_stats['maxsize']} voci · "
+            f"hit {cache_stats['hits']} · miss {cache_stats['misses']} · "
+            f"evizioni {cache_stats['evictions']} · invalidazioni {cache_stats['invalidations']} · "
+            f"hit rate {cache_stats['hit_rate']:.1%}"
+        )
+
+        batch_stats = batcher.metrics()
+        if batch_stats["batches"]:
+            st.caption(
+                f"Micro-batch: {batch_stats['batches']} batch · {batch_stats['rows']} righe · "
+                f"dimensione media {batch_stats['batch_size_mean']:.1f} (max {batch_stats['batch_size_max']}) · "
+                f"attesa in coda p50 {batch_stats['queue_wait_p50_ms']:.2f} ms, "
+                f"p95 {batch_stats['queue_wait_p95_ms']:.2f} ms · "
+                f"flush {batch_stats['flush_reasons']}"
+            )
+
+        store_stats = store.stats()
+        st.caption(
+            f"Storico: {store_stats['written']} righe scritte in {store_stats['batches']} transazioni · "
+            f"in coda {store_stats['queued']} · scartate {store_stats['dropped']} · errori {store_stats['errors']}"
+        )
+
+
 st.write("---")
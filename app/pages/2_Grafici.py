@@ -1,8 +1,14 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+import time
 import sys
 import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from utilis.dataset import DATA_PATH, dataset_version, load_dataset
+from utilis.data_cube import DataCube
+from utilis.data_viewer import DataViewer, PAGE_SIZES
+from utilis.bitmap_filter import BitmapIndex, BitmapSlice, BMI_BANDS, BP_BANDS
+from utilis.sql_backend import SQL_BACKEND, SqlViewer, load_database
+from utilis.timing import get_recorder
 
 #-----------Configurazione pagina dashboard------------
 st.set_page_config(page_title="Grafici", page_icon="📊", layout="wide")
@@ -23,190 +29,322 @@ with st.sidebar:
     st.markdown("📊 **Dashboard**")
     if st.button("🧍Confronto paziente"):
         st.switch_page("pages/3_Confronto.py")
+    st.write("")
+    show_timings = st.toggle("⏱️ Debug latenze", value=False)
+
+# Tempi per sezione: ogni sezione (e ogni rerun del fragment della tabella) registra la propria esecuzione
+recorder = get_recorder("grafici")
+script_start = time.perf_counter()
 
 st.title("📊 Analisi Grafica del Dataset")
 
 #-----------Dati dal db------------
-df = pd.read_csv("data/cardio_db.csv")
-
-# Rimuovo OUTLIER estremi nel BMI
-df = df[(df["BMI"] > 10) & (df["BMI"] < 60)]
-
-df = df.dropna(subset=["age", "BMI", "cardio", "gender"])
+@st.cache_resource # condiviso tra sessioni, ricaricato solo se cambia il CSV
+def load_data(version):
+    # cache binare per colonna, outlier BMI già rimossi in fase di build
+    return load_dataset(DATA_PATH)
+
+@st.cache_resource # cubo genere × età, costruito una volta per versione del dataset
+def load_cube(version):
+    return DataCube(load_data(version))
+
+@st.cache_resource # tabella a pagine: argsort per colonna riutilizzati tra sessioni
+def load_viewer(version):
+    return DataViewer(load_data(version))
+
+@st.cache_resource # bitset per valore/fascia, costruiti una volta per versione del dataset
+def load_bitmaps(version):
+    return BitmapIndex(load_data(version))
+
+@st.cache_resource(max_entries=16) # aggregati delle combinazioni di filtri più recenti
+def load_selection(version, equals, age_range):
+    # Filtri oltre a genere/età: aggregati come popcount sui bitset, senza espandere le righe
+    bitmaps = load_bitmaps(version)
+    return BitmapSlice(bitmaps, bitmaps.query(dict(equals), {"age": age_range}), age_range)
+
+# Backend SQLite (CARDIO_DATA_BACKEND=sqlite): filtri e aggregati eseguiti dal database,
+# in memoria solo i risultati dei GROUP BY
+@st.cache_resource # tabella indicizzata, ricostruita solo se cambia il CSV
+def load_sql(version):
+    return load_database(DATA_PATH)
+
+@st.cache_resource(max_entries=16) # aggregati delle combinazioni di filtri più recenti
+def load_sql_selection(version, equals, age_range):
+    return load_sql(version).select(dict(equals), {"age": age_range})
+
+version = dataset_version(DATA_PATH)
+if SQL_BACKEND:
+    db = load_sql(version)
+    viewer = SqlViewer(db)
+    filter_values = db.values
+    age_min, age_max = db.bounds["age"][:2]
+else:
+    df = load_data(version)
+    cube = load_cube(version)
+    viewer = load_viewer(version)
+    bitmaps = load_bitmaps(version)
+    filter_values = bitmaps.values
+    age_min, age_max = int(df.age.min()), int(df.age.max())
 
 # ------------------- FILTRI -------------------
+# In un form: le modifiche vengono applicate (un solo rerun) alla conferma
 col1, col2= st.columns(2)
 with col1:
     with st.expander("Filtri"):
-        col1, col2 = st.columns(2)
+        with st.form("filtri", border=False):
+            col1, col2 = st.columns(2)
+
+            sesso = col1.multiselect(
+                "Genere",
+                options=[1, 2],
+                format_func=lambda x: "Donna" if x == 1 else "Uomo"
+            )
+
+            eta_range = col2.slider(
+                "Età",
+                age_min, age_max,
+                (age_min, age_max)
+            )
+
+            livelli = {1: "normale", 2: "sopra la norma", 3: "molto alto"}
+            si_no = lambda x: "Sì" if x == 1 else "No"
+
+            col1, col2 = st.columns(2)
+            colesterolo = col1.multiselect("Colesterolo", filter_values("cholesterol"),
+                                           format_func=livelli.get)
+            glucosio = col2.multiselect("Glucosio", filter_values("gluc"),
+                                        format_func=livelli.get)
+
+            col1, col2 = st.columns(2)
+            fascia_bmi = col1.multiselect("Fascia BMI", filter_values("bmi_band"),
+                                          format_func=lambda i: BMI_BANDS[i])
+            fascia_pressione = col2.multiselect("Fascia pressione", filter_values("bp_band"),
+                                                format_func=lambda i: BP_BANDS[i])
+
+            col1, col2, col3, col4 = st.columns(4)
+            fumo = col1.multiselect("Fumatore", [0, 1], format_func=si_no)
+            alcol = col2.multiselect("Alcol", [0, 1], format_func=si_no)
+            attivita = col3.multiselect("Attività fisica", [0, 1], format_func=si_no)
+            rischio = col4.multiselect("Cardio", [0, 1], format_func=si_no)
+
+            st.form_submit_button("Applica filtri")
+
+# Righe selezionate: AND tra colonne, OR tra i valori scelti (lista vuota = tutti)
+altri_filtri = {
+    "cholesterol": colesterolo, "gluc": glucosio, "bmi_band": fascia_bmi, "bp_band": fascia_pressione,
+    "smoke": fumo, "alco": alcol, "active": attivita, "cardio": rischio,
+}
+equals = tuple((c, tuple(v)) for c, v in {"gender": sesso, **altri_filtri}.items() if v)
+if SQL_BACKEND:
+    sel = load_sql_selection(version, equals, eta_range)
+    n_filtered = sel.n
+    selection = sel  # conteggi per i boxplot e WHERE per la tabella
+else:
+    bits = bitmaps.query({"gender": sesso, **altri_filtri}, {"age": eta_range})
+    n_filtered = bitmaps.count(bits)
+    selection = bitmaps.mask(bits)  # per boxplot e tabella
+
+if n_filtered == 0:
+    st.warning("⚠️ Nessun paziente corrisponde ai filtri selezionati.")
+    st.stop()
+
+# Aggregati (KPI, istogrammi, incidenze): dal cubo genere × età se ci sono solo
+# quei filtri, altrimenti dai bitset dell'indice (BitmapSlice)
+if not SQL_BACKEND:
+    if any(v for v in altri_filtri.values()):
+        sel = load_selection(version, equals, eta_range)
+    else:
+        sel = cube.select(sesso, eta_range)
+
+# KPI, distribuzioni, incidenze e boxplot non hanno widget: vengono ridisegnati a ogni
+# rerun completo (cambio filtri) a partire dagli aggregati in cache della selezione.
+# Solo la tabella, che ha widget propri, è un fragment.
 
-        sesso = col1.multiselect(
-            "Genere",
-            options=[1, 2],
-            format_func=lambda x: "Donna" if x == 1 else "Uomo"
-        )
+# ------------------- Indicatori principali -------------------
+def kpi_section(sel):
+    with recorder.timed("indicatori"):
+        st.subheader("Indicatori principali")
+        colA, colB, colC, colD = st.columns(4)
 
-        eta_range = col2.slider(
-            "Età",
-            int(df.age.min()), int(df.age.max()),
-            (int(df.age.min()), int(df.age.max()))
-        )
+        colA.metric("Pazienti", sel.n)
+        colB.metric("Età media", f"{sel.mean_age():.0f}")
+        colC.metric("BMI medio", f"{sel.mean_bmi():.1f}")
+        colD.metric("Rischio medio (%)", f"{sel.cardio_rate()*100:.1f}%")
 
-df_filtered = df.copy()
+kpi_section(sel)
 
-if sesso:
-    df_filtered = df_filtered[df_filtered["gender"].isin(sesso)]
+st.markdown("---")
 
-df_filtered = df_filtered[
-    (df_filtered["age"] >= eta_range[0]) &
-    (df_filtered["age"] <= eta_range[1])
-]
+# plotly importato dopo titolo, filtri e KPI: la prima parte della pagina
+# viene inviata al browser senza attendere l'import
+import plotly.express as px
+from utilis.charts import histogram_figure, box_stats, box_stats_from_counts, box_figure
 
-# ------------------- Indicatori principali -------------------
-st.subheader("Indicatori principali")
-colA, colB, colC, colD = st.columns(4)
+# ------------------- Distribuzioni -------------------
+def histogram(sel, col, nbins, color, title):
+    # Istogramma dai conteggi del cubo
+    counts, edges = sel.histogram(col, nbins)
+    return histogram_figure(counts, edges, color, title=title, xaxis_title=col)
 
-colA.metric("Pazienti", len(df_filtered))
-colB.metric("Età media", f"{df_filtered.age.mean():.0f}")
-colC.metric("BMI medio", f"{df_filtered.BMI.mean():.1f}")
-colD.metric("Rischio medio (%)", f"{df_filtered.cardio.mean()*100:.1f}%")
+def distributions_section(sel):
+    with recorder.timed("distribuzioni"):
+        st.subheader("Distribuzioni cliniche")
 
-st.markdown("---")
+        #Prima riga
 
-# ------------------- Distribuzioni -------------------
-st.subheader("Distribuzioni cliniche")
+        col1, col2 = st.columns(2)
 
-#Prima riga
+        with col1:
+            fig = histogram(sel, "age", 30, "#4a90e2", "Distribuzione Età")
+            st.plotly_chart(fig, width="stretch")
 
-col1, col2 = st.columns(2)
+        with col2:
+            fig = histogram(sel, "BMI", 30, "#7b8ba4", "Distribuzione BMI")
+            st.plotly_chart(fig, width="stretch")
 
-with col1:
-    fig = px.histogram(df_filtered, x="age", nbins=30,
-                       color_discrete_sequence=["#4a90e2"])
-    fig.update_layout(showlegend=False, title="Distribuzione Età")
-    st.plotly_chart(fig, width="stretch")
-
-with col2:
-    fig = px.histogram(df_filtered, x="BMI", nbins=30,
-                       color_discrete_sequence=["#7b8ba4"])
-    fig.update_layout(showlegend=False, title="Distribuzione BMI")
-    st.plotly_chart(fig, width="stretch")
-
-# Seconda riga
-
-col3, col4, col5 = st.columns(3)
-
-with col3:
-    fig = px.histogram(df_filtered, x="ap_hi", nbins=30,
-                       color_discrete_sequence=["#9bb7d4"])
-    fig.update_layout(showlegend=False, title="Pressione Sistolica (ap_hi)")
-    st.plotly_chart(fig, width="stretch")
-
-with col4:
-    fig = px.histogram(df_filtered, x="cholesterol", nbins=3,
-                       color_discrete_sequence=["#b0c4de"])
-    fig.update_layout(showlegend=False, title="Colesterolo")
-    st.plotly_chart(fig, width="stretch")
-
-with col5:
-    fig = px.histogram(df_filtered, x="gluc", nbins=3,
-                       color_discrete_sequence=["#92a7c2"])
-    fig.update_layout(showlegend=False, title="Glucosio")
-    st.plotly_chart(fig, width="stretch")
+        # Seconda riga
 
-st.markdown("---")
+        col3, col4, col5 = st.columns(3)
+
+        with col3:
+            fig = histogram(sel, "ap_hi", 30, "#9bb7d4", "Pressione Sistolica (ap_hi)")
+            st.plotly_chart(fig, width="stretch")
+
+        with col4:
+            fig = histogram(sel, "cholesterol", 3, "#b0c4de", "Colesterolo")
+            st.plotly_chart(fig, width="stretch")
 
-# ------------------- FUNZIONE % CARDIO -------------------
-def percentuali(df, col):
-    grouped = df.groupby(col)["cardio"].mean().reset_index()
-    grouped["percentuale"] = grouped["cardio"] * 100
-    return grouped
+        with col5:
+            fig = histogram(sel, "gluc", 3, "#92a7c2", "Glucosio")
+            st.plotly_chart(fig, width="stretch")
+
+distributions_section(sel)
+
+st.markdown("---")
 
 # ------------------- INCIDENZA CARDIACA -------------------
-st.subheader("Incidenza rischio cardiaco (%)")
+def incidence_section(sel):
+    with recorder.timed("incidenza"):
+        st.subheader("Incidenza rischio cardiaco (%)")
 
-col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
 
-# ---- Per fasce età
-with col1:
-    df_age_bins = df_filtered.copy()
-    df_age_bins["fasce_età"] = pd.cut(df_age_bins["age"], bins=[0,30,45,60,75,120])
-    df_age_bins["fasce_età"] = df_age_bins["fasce_età"].astype(str)
-    p = percentuali(df_age_bins, "fasce_età")
-    fig = px.bar(p, x="fasce_età", y="percentuale",
-                 color_discrete_sequence=["#4a90e2"])
-    fig.update_layout(title="Per fasce d’età", yaxis_title="% cardio")
-    st.plotly_chart(fig, width="stretch")
-
-# ---- Per genere
-with col2:
-    p = percentuali(df_filtered, "gender")
-    p["gender"] = p["gender"].map({1:"Donna", 2:"Uomo"})
-    fig = px.bar(p, x="gender", y="percentuale",
-                 color_discrete_sequence=["#7b8ba4"])
-    fig.update_layout(title="Per genere", yaxis_title="% cardio")
-    st.plotly_chart(fig, width="stretch")
-
-# Terza riga
-col3, col4 = st.columns(2)
-
-# ---- Per fasce BMI
-with col3:
-    df_bmi_bins = df_filtered.copy()
-    df_bmi_bins["fasce_BMI"] = pd.qcut(df_bmi_bins["BMI"], q=4)
-    df_bmi_bins["fasce_BMI"] = df_bmi_bins["fasce_BMI"].astype(str)  # FIX
-    p = percentuali(df_bmi_bins, "fasce_BMI")
-    fig = px.bar(p, x="fasce_BMI", y="percentuale",
-                 color_discrete_sequence=["#9bb7d4"])
-    fig.update_layout(title="Per fasce BMI", yaxis_title="% cardio")
-    st.plotly_chart(fig, width="stretch")
-
-# ---- Per glucosio
-with col4:
-    p = percentuali(df_filtered, "gluc")
-    fig = px.bar(p, x="gluc", y="percentuale",
-                 color_discrete_sequence=["#b0c4de"])
-    fig.update_layout(title="Per glucosio", yaxis_title="% cardio")
-    st.plotly_chart(fig, width="stretch")
+        # ---- Per fasce età
+        with col1:
+            p = sel.incidence_by_age_band([0,30,45,60,75,120])
+            fig = px.bar(p, x="fasce_età", y="percentuale",
+                         color_discrete_sequence=["#4a90e2"])
+            fig.update_layout(title="Per fasce d’età", yaxis_title="% cardio")
+            st.plotly_chart(fig, width="stretch")
+
+        # ---- Per genere
+        with col2:
+            p = sel.incidence_by_gender()
+            p["gender"] = p["gender"].map({1:"Donna", 2:"Uomo"})
+            fig = px.bar(p, x="gender", y="percentuale",
+                         color_discrete_sequence=["#7b8ba4"])
+            fig.update_layout(title="Per genere", yaxis_title="% cardio")
+            st.plotly_chart(fig, width="stretch")
+
+        # Terza riga
+        col3, col4 = st.columns(2)
+
+        # ---- Per fasce BMI
+        with col3:
+            p = sel.incidence_by_quantile("BMI", q=4)
+            fig = px.bar(p, x="fasce_BMI", y="percentuale",
+                         color_discrete_sequence=["#9bb7d4"])
+            fig.update_layout(title="Per fasce BMI", yaxis_title="% cardio")
+            st.plotly_chart(fig, width="stretch")
+
+        # ---- Per glucosio
+        with col4:
+            p = sel.incidence_by("gluc")
+            fig = px.bar(p, x="gluc", y="percentuale",
+                         color_discrete_sequence=["#b0c4de"])
+            fig.update_layout(title="Per glucosio", yaxis_title="% cardio")
+            st.plotly_chart(fig, width="stretch")
+
+incidence_section(sel)
 
 st.markdown("---")
 
 # ------------------- BOXPLOT CONFRONTI CARDIO -------------------
-st.subheader("Confronto assenza di problemi cardiaci(0) e presenza di problemi cardiaci(1)")
+def cardio_box(selection, col, label, title):
+    # Box per cardio 0/1 da quartili, baffi e un campione limitato di outlier
+    if SQL_BACKEND:
+        # statistiche dai conteggi per valore già calcolati con la selezione
+        groups = {c: box_stats_from_counts(v, n) for c, (v, n) in selection.box_counts(col).items()}
+    else:
+        cardio = df["cardio"].to_numpy()
+        values = df[col].to_numpy()
+        groups = {c: box_stats(values[selection & (cardio == c)]) for c in (0, 1)}
+    return box_figure(groups, ["#7b8ba4", "#4a90e2"], title=title,
+                      xaxis_title="Rischio", yaxis_title=label)
+
+def box_section(selection):
+    with recorder.timed("boxplot"):
+        st.subheader("Confronto assenza di problemi cardiaci(0) e presenza di problemi cardiaci(1)")
+
+        # Prima riga boxplot
+        col1, col2 = st.columns(2)
 
-# Prima riga boxplot
-col1, col2 = st.columns(2)
+        with col1:
+            fig = cardio_box(selection, "age", "Età", "Età vs rischio")
+            st.plotly_chart(fig, width="stretch")
 
-with col1:
-    fig = px.box(df_filtered, x="cardio", y="age",
-                 color="cardio",
-                 color_discrete_sequence=["#7b8ba4", "#4a90e2"],
-                 labels={"cardio": "Rischio", "age": "Età"})
-    fig.update_layout(title="Età vs rischio", showlegend=False)
-    st.plotly_chart(fig, width="stretch")
-
-with col2:
-    fig = px.box(df_filtered, x="cardio", y="BMI",
-                 color="cardio",
-                 color_discrete_sequence=["#7b8ba4", "#4a90e2"],
-                 labels={"cardio": "Rischio", "BMI": "BMI"})
-    fig.update_layout(title="BMI vs rischio", showlegend=False)
-    st.plotly_chart(fig, width="stretch")
-
-# Seconda riga boxplot
-col3, col4 = st.columns(2)
-
-with col3:
-    fig = px.box(df_filtered, x="cardio", y="ap_hi",
-                 color="cardio",
-                 color_discrete_sequence=["#7b8ba4", "#4a90e2"],
-                 labels={"cardio": "Rischio", "ap_hi": "Pressione Sistolica"})
-    fig.update_layout(title="Pressione vs rischio", showlegend=False)
-    st.plotly_chart(fig, width="stretch")
-
-st.subheader("Dataset")
-with st.expander(f"📄({len(df_filtered)} righe)"):
-    st.dataframe(df_filtered, hide_index=True)
+        with col2:
+            fig = cardio_box(selection, "BMI", "BMI", "BMI vs rischio")
+            st.plotly_chart(fig, width="stretch")
+
+        # Seconda riga boxplot
+        col3, col4 = st.columns(2)
+
+        with col3:
+            fig = cardio_box(selection, "ap_hi", "Pressione Sistolica", "Pressione vs rischio")
+            st.plotly_chart(fig, width="stretch")
+
+box_section(selection)
+
+# ------------------- TABELLA -------------------
+@st.fragment # ordinamento e pagine rieseguono solo la tabella
+def table_section(selection, n_filtered):
+    with recorder.timed("tabella"):
+        st.subheader("Dataset")
+        with st.expander(f"📄({n_filtered} righe)"):
+            # Solo la pagina corrente viene serializzata e inviata al browser
+            col1, col2, col3, col4 = st.columns(4)
+            sort_by = col1.selectbox("Ordina per", [None] + viewer.columns,
+                                     format_func=lambda c: "—" if c is None else c)
+            descending = col2.toggle("Decrescente", disabled=sort_by is None)
+            page_size = col3.selectbox("Righe per pagina", PAGE_SIZES)
+
+            rows = viewer.rows(selection, sort_by, descending)
+            n_pages = viewer.n_pages(rows, page_size)
+            page = col4.number_input("Pagina", min_value=1, max_value=n_pages, value=1)
+
+            st.dataframe(viewer.page(rows, page, page_size), hide_index=True)
+            st.caption(f"Pagina {page} di {n_pages}")
+
+            # CSV generato in memoria solo al click (download differito)
+            st.download_button("⬇️ Scarica CSV filtrato", data=lambda: viewer.export_csv(rows),
+                               file_name="cardio_filtrato.csv", mime="text/csv")
+
+table_section(selection, n_filtered)
 
 
 st.write("---")
+
+# Rerun completo (filtri, cambio pagina): i rerun dei soli fragment non passano di qui
+recorder.record("rerun completo", time.perf_counter() - script_start)
+
+#-----------Pannello di debug: latenze per sezione------------
+if show_timings:
+    with st.expander("⏱️ Latenze per sezione (ms, finestra mobile)", expanded=True):
+        summary = recorder.summary()
+        st.table({
+            "Sezione": list(summary),
+            "Esecuzioni": [r["count"] for r in summary.values()],
+            "p50": [f"{r['p50']:.1f}" for r in summary.values()],
+            "p95": [f"{r['p95']:.1f}" for r in summary.values()],
+        })
@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 # Configurazione pagina confronto
 st.set_page_config(page_title="Confronto Paziente", page_icon="🧍", layout="wide")
@@ -33,12 +33,39 @@ if last is None:
         st.switch_page("pages/1_Predizione.py")
     st.stop()
 
+# Import pesanti solo se c'è un paziente da confrontare (nessun costo sul ramo di uscita)
+import numpy as np
+import plotly.graph_objects as go
+from utilis.dataset import DATA_PATH, dataset_version, load_columns
+from utilis.population_stats import PopulationIndex
+from utilis.charts import histogram_figure
+from utilis.neighbors import CohortIndex
+
 st.title("Confronta i tuoi risultati con il resto della popolazione")
 
 
 # ------------------- CARICO DB -------------------
-df = pd.read_csv("data/cardio_db.csv")
-df = df[(df["BMI"] > 10) & (df["BMI"] < 60)]  # pulizia BMI
+@st.cache_resource # costruito una volta per versione del dataset, condiviso tra sessioni
+def load_stats(version):
+    # pulizia BMI già applicata nella cache del dataset
+    return PopulationIndex(load_columns(DATA_PATH))
+
+@st.cache_resource # indice dei vicini, costruito una volta per versione del dataset
+def load_neighbors(version):
+    return CohortIndex(load_columns(DATA_PATH))
+
+version = dataset_version(DATA_PATH)
+stats = load_stats(version)
+
+
+def population_histogram(col, value, color):
+    # Istogramma dai conteggi precalcolati + punto rosso del paziente
+    counts, edges = stats.histogram(col)
+    fig = histogram_figure(counts, edges, color, xaxis_title=col, name=col)
+    fig.add_scatter(x=[value], y=[0], mode="markers",
+                    marker=dict(size=16, color="red"),
+                    name="Tu")
+    return fig
 
 # ------------------- SEZIONE 1 — DATI DEL PAZIENTE -------------------
 
@@ -48,7 +75,7 @@ col1, col2, col3 = st.columns(3)
 
 # --- Età ---
 eta = last["age"]
-mean_age = df["age"].mean()
+mean_age = stats.mean("age")
 if eta < mean_age - 5:
     age_status = ("🟢 Età sotto la media", "green")
 elif eta > mean_age + 5:
@@ -100,14 +127,11 @@ st.write("Ogni grafico mostra la distribuzione dei valori nella popolazione. Il
 # ------------------- GRAFICO 1 — ETÀ -------------------
 st.subheader("📍 Dove ti trovi rispetto all’età della popolazione")
 
-fig = px.histogram(df, x="age", nbins=30, color_discrete_sequence=["#4a90e2"])
-fig.add_scatter(x=[eta], y=[0], mode="markers",
-                marker=dict(size=16, color="red"),
-                name="Tu")
+fig = population_histogram("age", eta, "#4a90e2")
 
 st.plotly_chart(fig, width="stretch")
 
-percentile_age = (df["age"] < eta).mean() * 100
+percentile_age = stats.percentile("age", eta)
 st.write(f"➡ Sei più giovane del **{percentile_age:.1f}%** della popolazione.")
 
 st.markdown("---")
@@ -115,14 +139,11 @@ st.markdown("---")
 # ------------------- GRAFICO 2 — BMI -------------------
 st.subheader("📍 Dove ti trovi nel BMI della popolazione")
 
-fig = px.histogram(df, x="BMI", nbins=30, color_discrete_sequence=["#7b8ba4"])
-fig.add_scatter(x=[bmi], y=[0], mode="markers",
-                marker=dict(size=16, color="red"),
-                name="Tu")
+fig = population_histogram("BMI", bmi, "#7b8ba4")
 
 st.plotly_chart(fig, width="stretch")
 
-percentile_bmi = (df["BMI"] < bmi).mean() * 100
+percentile_bmi = stats.percentile("BMI", bmi)
 st.write(f"➡ Il tuo BMI è superiore a **{percentile_bmi:.1f}%** della popolazione.")
 
 st.markdown("---")
@@ -130,18 +151,66 @@ st.markdown("---")
 # ------------------- GRAFICO 3 — PRESSIONE -------------------
 st.subheader("📍 Pressione sistolica vs popolazione")
 
-fig = px.histogram(df, x="ap_hi", nbins=30, color_discrete_sequence=["#9bb7d4"])
-fig.add_scatter(x=[ap_hi], y=[0], mode="markers",
-                marker=dict(size=16, color="red"),
-                name="Tu")
+fig = population_histogram("ap_hi", ap_hi, "#9bb7d4")
 
 st.plotly_chart(fig, width="stretch")
 
-percentile_press = (df["ap_hi"] < ap_hi).mean() * 100
+percentile_press = stats.percentile("ap_hi", ap_hi)
 st.write(f"➡ La tua pressione sistolica è più alta del **{percentile_press:.1f}%** della popolazione.")
 
 st.markdown("---")
 
+# ------------------- PERCENTILI DI TUTTE LE VARIABILI -------------------
+st.subheader("📍 I tuoi percentili per tutte le variabili")
+
+labels = {
+    "age": "Età", "height": "Altezza (cm)", "weight": "Peso (kg)", "BMI": "BMI",
+    "ap_hi": "Pressione sistolica", "ap_lo": "Pressione diastolica",
+    "cholesterol": "Colesterolo", "gluc": "Glucosio",
+}
+percentili = stats.percentiles(last)
+
+st.table({
+    "Variabile": [labels[c] for c in percentili],
+    "Tuo valore": [f"{last[c]:g}" for c in percentili],
+    "Media popolazione": [f"{stats.mean(c):.1f}" for c in percentili],
+    "Percentile (%)": [f"{p:.1f}" for p in percentili.values()],
+})
+
+st.markdown("---")
+
+# ------------------- PAZIENTI SIMILI -------------------
+@st.fragment # cambiare k riesegue solo questa sezione
+def similar_patients_section():
+    st.header("👥 Pazienti simili a te")
+    st.write("I pazienti del dataset più vicini al tuo profilo (tutte le variabili, standardizzate).")
+
+    k = st.select_slider("Numero di pazienti simili", options=[25, 50, 100, 250, 500, 1000], value=100)
+    neighbors = load_neighbors(version)
+    cohort = neighbors.cohort(last, k)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Problemi cardiaci tra i simili", f"{cohort['cardio_rate']:.1%}")
+    col2.metric("Problemi cardiaci nella popolazione", f"{neighbors.cardio_rate:.1%}")
+    col3.metric("Rischio stimato dal modello", f"{last['predicted_risk']:.1%}")
+
+    means = cohort["means"]
+    st.table({
+        "Variabile": [labels[c] for c in labels],
+        "Tuo valore": [f"{last[c]:g}" for c in labels],
+        "Media simili": [f"{means[c]:.1f}" for c in labels],
+        "Media popolazione": [f"{stats.mean(c):.1f}" for c in labels],
+    })
+    st.caption(
+        f"Tra i simili: uomini {means['gender'] - 1:.0%}, fumatori {means['smoke']:.0%}, "
+        f"consumo di alcol {means['alco']:.0%}, fisicamente attivi {means['active']:.0%}. "
+        f"Distanza mediana dal tuo profilo: {np.median(cohort['distances']):.2f} deviazioni standard."
+    )
+
+similar_patients_section()
+
+st.markdown("---")
+
 # ------------------- SEZIONE — RADAR Paziente vs Media -------------------
 
 st.header("Confronto Paziente vs Media del Campione")
@@ -164,11 +233,11 @@ norm_patient = [
 ]
 
 norm_mean = [
-    normalize(df["age"].mean(), 18, 100),
-    normalize(df["BMI"].mean(), 10, 50),
-    normalize(df["ap_hi"].mean(), 80, 200),
-    normalize(df["cholesterol"].mean(), 1, 3),
-    normalize(df["gluc"].mean(), 1, 3),
+    normalize(stats.mean("age"), 18, 100),
+    normalize(stats.mean("BMI"), 10, 50),
+    normalize(stats.mean("ap_hi"), 80, 200),
+    normalize(stats.mean("cholesterol"), 1, 3),
+    normalize(stats.mean("gluc"), 1, 3),
 ]
 
 # Chiusura poligono
@@ -220,7 +289,6 @@ st.plotly_chart(fig, width="stretch")
 confronti = []
 
 # Età
-mean_age = df["age"].mean()
 if last["age"] > mean_age + 5:
     confronti.append("• **Età:** superiore alla media del campione (🟡)")
 elif last["age"] < mean_age - 5:
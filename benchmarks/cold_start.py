@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import numpy as np
+
+# Avvio a freddo del motore di predizione in un processo nuovo: tempo (import +
+# caricamento + prima predizione), RSS massimo e presenza di sklearn in memoria.
+#   python benchmarks/cold_start.py [--runs 5]
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import sys, json, resource, warnings
+warnings.simplefilter("ignore")
+sys.path.insert(0, {root!r})
+from utilis.feature_preprocessing import preprocess_batch
+MODE = {mode!r}
+if MODE == "pickle":
+    from utilis.inference import load_engine
+    engine = load_engine()
+else:
+    from utilis.artifact import load_artifact
+    engine = load_artifact()
+X = preprocess_batch(age=50, height=170, weight=70, ap_hi=120, ap_lo=80, gender=1,
+                     cholesterol=1, gluc=1, smoke=0, alco=0, active=1, as_array=True)
+engine.predict(X)
+print(json.dumps({{
+    "seconds": time.perf_counter() - t0,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "sklearn_imported": "sklearn" in sys.modules,
+}}))
+"""
+
+
+def measure(mode, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD.format(root=ROOT, mode=mode)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "median_s": float(np.median([s["seconds"] for s in samples])),
+        "max_rss_mb": float(np.median([s["max_rss_mb"] for s in samples])),
+        "sklearn_imported": samples[-1]["sklearn_imported"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avvio a freddo: pickle sklearn vs artefatto .npz")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {mode: measure(mode, args.runs) for mode in ("pickle", "npz")}
+    for mode, r in results.items():
+        print(f"{mode:<7} {r['median_s'] * 1000:8.1f} ms  RSS {r['max_rss_mb']:7.1f} MB  "
+              f"sklearn importato: {r['sklearn_imported']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+# Costo degli import per pagina, catturato con `python -X importtime` eseguendo
+# ogni pagina in un processo nuovo tramite streamlit.testing (AppTest).
+#   python benchmarks/import_cost.py [--top 10] [--json out.json]
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY = ["pandas", "plotly", "sklearn", "scipy", "numpy", "pyarrow"]
+
+PAGES = {
+    "Home": ("app/0_Home.py", False),
+    "Predizione": ("app/pages/1_Predizione.py", False),
+    "Grafici": ("app/pages/2_Grafici.py", False),
+    "Confronto (senza paziente)": ("app/pages/3_Confronto.py", False),
+    "Confronto": ("app/pages/3_Confronto.py", True),
+}
+
+LAST_VALUES = {
+    "age": 50, "height": 170, "weight": 80, "BMI": 27.68, "ap_hi": 130, "ap_lo": 85,
+    "gender": 2, "cholesterol": 2, "gluc": 1, "smoke": 0, "alco": 0, "active": 1,
+    "predicted_risk": 0.6, "predicted_class": 1,
+}
+
+CHILD = r"""
+import warnings
+warnings.simplefilter("ignore")
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({page!r}, default_timeout=120)
+if {with_patient!r}:
+    at.session_state["last_values"] = {last_values!r}
+at.run()
+"""
+
+
+def _importtime(page, with_patient):
+    code = CHILD.format(page=page, with_patient=with_patient, last_values=LAST_VALUES)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+
+    modules = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2].strip()
+        modules[name] = (self_us, cumulative_us)
+    return modules
+
+
+def _by_package(modules):
+    packages = defaultdict(int)
+    for name, (self_us, _) in modules.items():
+        packages[name.split(".")[0]] += self_us
+    return packages
+
+
+def report(top=10):
+    # Il runtime di streamlit/AppTest è comune a tutte le pagine: viene sottratto
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write("import streamlit as st\n")
+        blank = f.name
+    try:
+        baseline = set(_importtime(blank, False))
+    finally:
+        os.unlink(blank)
+
+    results = {}
+    for label, (page, with_patient) in PAGES.items():
+        modules = _importtime(os.path.join(ROOT, page), with_patient)
+        extra = {m: t for m, t in modules.items() if m not in baseline}
+        packages = _by_package(extra)
+        results[label] = {
+            "page": page,
+            "total_ms": sum(s for s, _ in extra.values()) / 1000,
+            "modules": len(extra),
+            "heavy": {p: packages[p] / 1000 for p in HEAVY if p in packages},
+            "top_packages": {p: t / 1000 for p, t in sorted(packages.items(), key=lambda kv: -kv[1])[:top]},
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo degli import per pagina (-X importtime)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+
+    results = report(args.top)
+    for label, r in results.items():
+        heavy = ", ".join(f"{p} {t:.0f} ms" for p, t in r["heavy"].items()) or "-"
+        print(f"\n{label} ({r['page']}): {r['total_ms']:.0f} ms in {r['modules']} moduli oltre a streamlit")
+        print(f"  pacchetti pesanti: {heavy}")
+        for p, t in r["top_packages"].items():
+            print(f"    {p:<28} {t:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utilis.prediction_store import PredictionStore, SCHEMA, INSERT
+
+# Storico predizioni sotto sessioni concorrenti: costo per chiamata nel percorso di
+# scoring (accodamento vs INSERT + commit sincrono) e righe/s effettivamente scritte.
+#   python benchmarks/prediction_store.py [--sessions 1,8,32] [--per-session 2000]
+
+FIELDS = (50, 170, 70.0, 120, 80, 1, 1, 1, 0, 0, 1)
+
+
+def _run_sessions(n_sessions, per_session, call):
+    # Ogni thread simula una sessione che registra per_session predizioni
+    latencies = [None] * n_sessions
+    barrier = threading.Barrier(n_sessions)
+
+    def session(i):
+        samples = np.empty(per_session)
+        barrier.wait()
+        for j in range(per_session):
+            t = time.perf_counter()
+            call(f"s{i}", j)
+            samples[j] = time.perf_counter() - t
+        latencies[i] = samples
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(n_sessions)]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return time.perf_counter() - t, np.concatenate(latencies) * 1e6
+
+
+def bench_store(path, n_sessions, per_session):
+    store = PredictionStore(path, queue_size=n_sessions * per_session)
+    record = lambda sid, j: store.record(sid, FIELDS, 0.4, 0, "bench", 0.1)
+    t0 = time.perf_counter()
+    elapsed, lat = _run_sessions(n_sessions, per_session, record)
+    store.flush()
+    persisted = time.perf_counter() - t0
+    stats = store.stats()
+    store.close()
+    return elapsed, persisted, lat, stats
+
+
+def bench_sync(path, n_sessions, per_session):
+    # Riferimento: INSERT + commit nel thread della richiesta (una connessione per sessione)
+    conns = {}
+    with sqlite3.connect(path) as conn:
+        conn.executescript(SCHEMA)
+
+    def insert(sid, j):
+        conn = conns.get(sid)
+        if conn is None:
+            conn = conns[sid] = sqlite3.connect(path, timeout=60, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(INSERT, (time.time(), sid, "bench", *FIELDS, 0.4, 0, "bench", 0.1, 0))
+
+    elapsed, lat = _run_sessions(n_sessions, per_session, insert)
+    for conn in conns.values():
+        conn.close()
+    return elapsed, lat
+
+
+def bench_history(path, rows, sessions=1000):
+    # Query per sessione e aggregato giornaliero su una tabella già popolata
+    store = PredictionStore(path, queue_size=rows)
+    for i in range(rows):
+        store.record(f"s{i % sessions}", FIELDS, 0.4, i % 2, "bench", 0.1)
+    store.flush()
+
+    def timed(fn, repeat=20):
+        fn()
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - t) / repeat * 1000
+
+    history_ms = timed(lambda: store.history("s42"))
+    summary_ms = timed(lambda: store.summary(since=time.time() - 3600), repeat=3)
+    store.close()
+    return history_ms, summary_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dello storico predizioni SQLite (WAL + scrittore in background)")
+    parser.add_argument("--sessions", default="1,8,32")
+    parser.add_argument("--per-session", type=int, default=2000)
+    parser.add_argument("--history-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="cardio_store_")
+    try:
+        print(f"{'sessioni':>8} {'modo':<6} {'chiamata p50':>13} {'p99':>10} {'max':>10} {'chiamate/s':>12} {'righe/s scritte':>16}")
+        for n in map(int, args.sessions.split(",")):
+            total = n * args.per_session
+            elapsed, persisted, lat, stats = bench_store(os.path.join(tmp, f"async_{n}.db"), n, args.per_session)
+            print(f"{n:>8} {'coda':<6} {np.percentile(lat, 50):10.1f} µs {np.percentile(lat, 99):7.1f} µs "
+                  f"{lat.max():7.0f} µs {total / elapsed:12,.0f} {stats['written'] / persisted:16,.0f}"
+                  f"  ({stats['batches']} transazioni, {stats['dropped']} scartate)")
+
+            elapsed, lat = bench_sync(os.path.join(tmp, f"sync_{n}.db"), n, args.per_session)
+            print(f"{n:>8} {'sync':<6} {np.percentile(lat, 50):10.1f} µs {np.percentile(lat, 99):7.1f} µs "
+                  f"{lat.max():7.0f} µs {total / elapsed:12,.0f} {total / elapsed:16,.0f}")
+
+        history_ms, summary_ms = bench_history(os.path.join(tmp, "history.db"), args.history_rows)
+        print(f"\n{args.history_rows:,} righe: storico di una sessione {history_ms:.3f} ms, "
+              f"aggregato giornaliero {summary_ms:.1f} ms")
+    finally:
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
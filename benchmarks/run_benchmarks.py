@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import shutil
+import pickle
+import argparse
+import platform
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utilis.feature_preprocessing import RAW_FIELDS, preprocess_input, preprocess_batch
+from utilis.inference import MODEL_PATH, SCALER_PATH, load_engine
+from utilis.dataset import DATA_PATH, load_dataset
+from utilis.data_cube import DataCube
+from utilis.bitmap_filter import BitmapIndex, BitmapSlice, bp_band
+
+# Micro-benchmark offline: python benchmarks/run_benchmarks.py [--sizes ...] [--compare baseline.json]
+
+DEFAULT_SIZES = "base,1000000,10000000"  # base = righe del dataset reale
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "latest.json")
+MIN_REPEAT_S = 0.05
+RAW_CHART_MAX_ROWS = 1_000_000  # oltre, le figure px con le righe grezze non vengono misurate
+
+
+def measure(fn, repeat=7, max_number=10_000):
+    # Come timeit.autorange: sceglie `number` in modo che ogni ripetizione duri almeno MIN_REPEAT_S
+    number = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t
+        if elapsed >= MIN_REPEAT_S or number >= max_number:
+            break
+        number = min(max_number, number * 10)
+
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t) / number * 1000)
+
+    samples = np.array(samples)
+    return {
+        "median_ms": float(np.median(samples)),
+        "min_ms": float(samples.min()),
+        "max_ms": float(samples.max()),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def measure_once(fn, repeat=3):
+    # Per operazioni lente o con effetti collaterali (es. ricostruzione della cache)
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    samples = np.array(samples)
+    return {"median_ms": float(np.median(samples)), "min_ms": float(samples.min()),
+            "max_ms": float(samples.max()), "number": 1, "repeat": repeat}
+
+
+def _resample(base, n_rows, seed=0):
+    idx = np.random.default_rng(seed).integers(0, len(base), n_rows)
+    return base.iloc[idx].reset_index(drop=True)
+
+
+# ------------------- Gruppi di benchmark -------------------
+
+def bench_preprocessing(results, base):
+    row = base.iloc[0]
+    args = [row[c] for c in RAW_FIELDS]
+    results["preprocess_input/single"] = measure(lambda: preprocess_input(*args))
+    results["preprocess_batch/single"] = measure(
+        lambda: preprocess_batch(as_array=True, **dict(zip(RAW_FIELDS, args))))
+
+    for n in (1_000, len(base)):
+        frame = base.head(n)
+        results[f"preprocess_batch/{n}"] = measure(lambda: preprocess_batch(frame, as_array=True))
+
+
+def bench_inference(results, base):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # InconsistentVersionWarning dei pickle
+        with open(MODEL_PATH, "rb") as f:
+            model = pickle.load(f)
+        with open(SCALER_PATH, "rb") as f:
+            scaler = pickle.load(f)
+        engine = load_engine()
+
+    X1 = preprocess_batch(base.head(1))
+    Xn = preprocess_batch(base)
+
+    def sklearn_single():
+        X_scaled = scaler.transform(X1)
+        model.predict_proba(X_scaled)
+        model.predict(X_scaled)
+
+    results["sklearn/single"] = measure(sklearn_single)
+    results[f"sklearn/{len(base)}"] = measure(lambda: model.predict_proba(scaler.transform(Xn)))
+    results["fused/single"] = measure(lambda: engine.predict(X1.to_numpy()))
+    results[f"fused/{len(base)}"] = measure(lambda: engine.predict(Xn.to_numpy()))
+
+
+def bench_loading(results):
+    results["load/read_csv"] = measure_once(lambda: pd.read_csv(DATA_PATH))
+
+    cache_dir = tempfile.mkdtemp(prefix="cardio_bench_")
+    try:
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            load_dataset(DATA_PATH, cache_dir)
+
+        results["load/cache_cold"] = measure_once(cold)
+        results["load/cache_warm"] = measure(lambda: load_dataset(DATA_PATH, cache_dir), repeat=5)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def _dashboard_pandas(df, genders, age_range):
+    # Percorso originale della dashboard: maschera + metriche + group-by su righe grezze
+    f = df[(df["age"] >= age_range[0]) & (df["age"] <= age_range[1]) & df["gender"].isin(genders)]
+    f.age.mean(), f.BMI.mean(), f.cardio.mean()
+    for col in ("age", "BMI", "ap_hi", "cholesterol", "gluc"):
+        np.histogram(f[col], bins=30)
+    f.groupby(pd.cut(f["age"], bins=[0, 30, 45, 60, 75, 120]), observed=True)["cardio"].mean()
+    f.groupby("gender")["cardio"].mean()
+    f.groupby(pd.qcut(f["BMI"], q=4), observed=True)["cardio"].mean()
+    f.groupby("gluc")["cardio"].mean()
+
+
+def _dashboard_cube(cube, genders, age_range):
+    sel = cube.select(genders, age_range)
+    sel.mean_age(), sel.mean_bmi(), sel.cardio_rate()
+    for col in ("age", "BMI", "ap_hi", "cholesterol", "gluc"):
+        sel.histogram(col)
+    sel.incidence_by_age_band()
+    sel.incidence_by_gender()
+    sel.incidence_by_quantile("BMI")
+    sel.incidence_by("gluc")
+
+
+def bench_dashboard(results, base, sizes):
+    for n in sizes:
+        df = base if n == len(base) else _resample(base, n)
+        cube = DataCube(df)
+        results[f"dashboard/pandas/{n}"] = measure(lambda: _dashboard_pandas(df, [1, 2], (40, 60)), repeat=3)
+        results[f"dashboard/cube_build/{n}"] = measure_once(lambda: DataCube(df), repeat=1)
+        results[f"dashboard/cube/{n}"] = measure(lambda: _dashboard_cube(cube, [1, 2], (40, 60)))
+        del df, cube
+
+
+FILTERS = {"gender": [2], "cholesterol": [2, 3], "smoke": [0], "bp_band": [2, 3]}
+FILTER_AGES = (40, 60)
+
+
+def _filter_mask(df):
+    # Stessa combinazione di FILTERS con maschere booleane ricostruite da zero
+    m = (df["age"] >= FILTER_AGES[0]) & (df["age"] <= FILTER_AGES[1])
+    m &= df["gender"].isin(FILTERS["gender"]) & df["cholesterol"].isin(FILTERS["cholesterol"])
+    m &= df["smoke"].isin(FILTERS["smoke"])
+    m &= np.isin(bp_band(df["ap_hi"].to_numpy(), df["ap_lo"].to_numpy()), FILTERS["bp_band"])
+    return m.to_numpy()
+
+
+def bench_filters(results, base, sizes):
+    for n in sizes:
+        df = base if n == len(base) else _resample(base, n)
+        results[f"filters/bitmap_build/{n}"] = measure_once(lambda: BitmapIndex(df), repeat=1)
+        index = BitmapIndex(df)
+        results[f"filters/pandas_mask/{n}"] = measure(lambda: _filter_mask(df).sum(), repeat=3)
+        results[f"filters/bitmap_count/{n}"] = measure(
+            lambda: index.count(index.query(FILTERS, {"age": FILTER_AGES})))
+        results[f"filters/bitmap_mask/{n}"] = measure(
+            lambda: index.mask(index.query(FILTERS, {"age": FILTER_AGES})))
+
+        # Aggregati della dashboard per la selezione: cubo sulle righe selezionate
+        # (O(righe selezionate)) vs popcount sulle fette dell'indice
+        def selection_cube(equals):
+            ids = index.ids(index.query(equals, {"age": FILTER_AGES}))
+            return DataCube({c: df[c].to_numpy()[ids] for c in df.columns}).select()
+
+        for label, equals in (("", FILTERS), ("_all", {})):
+            results[f"filters/selection_cube{label}/{n}"] = measure_once(lambda: selection_cube(equals))
+            results[f"filters/bitmap_slice{label}/{n}"] = measure_once(
+                lambda: BitmapSlice(index, index.query(equals, {"age": FILTER_AGES}), FILTER_AGES))
+        del df, index
+
+
+def _chart_payload(build):
+    # Costruzione + serializzazione JSON (quello che st.plotly_chart invia al browser)
+    fn = lambda: build().to_json()
+    r = measure(fn, repeat=3, max_number=100)
+    r["payload_bytes"] = len(fn())
+    return r
+
+
+def bench_charts(results, base, sizes):
+    import plotly.express as px
+    from utilis.charts import histogram_counts, histogram_figure, box_stats, box_figure
+
+    colors = ["#7b8ba4", "#4a90e2"]
+    for n in sizes:
+        df = base if n == len(base) else _resample(base, n)
+        cardio = df["cardio"].to_numpy()
+        bmi = df["BMI"].to_numpy()
+
+        def hist_agg():
+            counts, edges = histogram_counts(bmi, bins=30)
+            return histogram_figure(counts, edges, colors[1])
+
+        def box_agg():
+            return box_figure({c: box_stats(bmi[cardio == c]) for c in (0, 1)}, colors)
+
+        if n <= RAW_CHART_MAX_ROWS:
+            results[f"charts/histogram_raw/{n}"] = _chart_payload(
+                lambda: px.histogram(df, x="BMI", nbins=30, color_discrete_sequence=[colors[1]]))
+            results[f"charts/box_raw/{n}"] = _chart_payload(
+                lambda: px.box(df, x="cardio", y="BMI", color="cardio", color_discrete_sequence=colors))
+        results[f"charts/histogram_agg/{n}"] = _chart_payload(hist_agg)
+        results[f"charts/box_agg/{n}"] = _chart_payload(box_agg)
+        del df, cardio, bmi
+
+
+def bench_sql(results, base, sizes):
+    # Backend SQLite: build da CSV e aggregati della dashboard (stessi FILTERS) con GROUP BY
+    from utilis.sql_backend import load_database, db_path
+
+    cache_dir = tempfile.mkdtemp(prefix="cardio_sql_")
+    try:
+        for n in sizes:
+            path = os.path.join(cache_dir, f"rows_{n}.csv")
+            (base if n == len(base) else _resample(base, n)).to_csv(path, index=False)
+            results[f"sql/build/{n}"] = measure_once(lambda: load_database(path, cache_dir), repeat=1)
+            db = load_database(path, cache_dir)
+            results[f"sql/aggregates/{n}"] = measure(
+                lambda: db.select(FILTERS, {"age": FILTER_AGES}), repeat=3, max_number=100)
+            results[f"sql/aggregates_all/{n}"] = measure(lambda: db.select(), repeat=3, max_number=100)
+            os.remove(path)
+            os.remove(db_path(path, cache_dir))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+# ------------------- Confronto con baseline -------------------
+
+def compare(current, baseline, threshold):
+    # Regressione: mediana corrente oltre (1 + threshold) × mediana di baseline
+    rows = []
+    for name, cur in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = cur["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        rows.append((name, old["median_ms"], cur["median_ms"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark di preprocessing, inferenza, caricamento, dashboard e grafici")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="righe per i benchmark della dashboard (es. base,1000000,10000000)")
+    parser.add_argument("--only", default=None, help="gruppi separati da virgola: preprocessing,inference,loading,dashboard,filters,charts,sql")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", default=None, help="file JSON di baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regressione tollerata (0.10 = +10%%)")
+    args = parser.parse_args()
+
+    groups = args.only.split(",") if args.only else ["preprocessing", "inference", "loading", "dashboard", "filters", "charts", "sql"]
+    base = load_dataset(DATA_PATH)  # dataset pulito, come lo vede la dashboard
+    sizes = [len(base) if x == "base" else int(x) for x in args.sizes.split(",")]
+
+    results = {}
+    if "preprocessing" in groups:
+        bench_preprocessing(results, base)
+    if "inference" in groups:
+        bench_inference(results, base)
+    if "loading" in groups:
+        bench_loading(results)
+    if "dashboard" in groups:
+        bench_dashboard(results, base, sizes)
+    if "filters" in groups:
+        bench_filters(results, base, sizes)
+    if "charts" in groups:
+        bench_charts(results, base, sizes)
+    if "sql" in groups:
+        bench_sql(results, base, sizes)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    width = max(len(k) for k in results)
+    for name, r in results.items():
+        payload = f"  {r['payload_bytes']:>12,} B" if "payload_bytes" in r else ""
+        print(f"{name:<{width}}  {r['median_ms']:12.4f} ms{payload}")
+    print(f"\nRisultati salvati in {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        print(f"\nConfronto con {args.compare} (soglia +{args.threshold:.0%}):")
+        for name, old, cur, ratio, regressed in compare(report, baseline, args.threshold):
+            flag = "REGRESSIONE" if regressed else ""
+            regressions += regressed
+            print(f"{name:<{width}}  {old:12.4f} -> {cur:12.4f} ms  x{ratio:5.2f}  {flag}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
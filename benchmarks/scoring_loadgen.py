@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utilis.feature_preprocessing import RAW_FIELDS
+
+# Carico su utilis/scoring_server.py (da avviare a parte): latenze e richieste/s
+#   python benchmarks/scoring_loadgen.py [--concurrency 8] [--duration 10] [--batch 1]
+
+
+def _random_rows(rng, n):
+    # Pazienti casuali negli stessi intervalli dei widget della pagina Predizione
+    cols = {
+        "age": rng.integers(18, 101, n), "height": rng.integers(120, 221, n),
+        "weight": rng.integers(40, 201, n), "ap_hi": rng.integers(80, 251, n),
+        "ap_lo": rng.integers(40, 151, n), "gender": rng.integers(1, 3, n),
+        "cholesterol": rng.integers(1, 4, n), "gluc": rng.integers(1, 4, n),
+        "smoke": rng.integers(0, 2, n), "alco": rng.integers(0, 2, n),
+        "active": rng.integers(0, 2, n),
+    }
+    return [{f: int(cols[f][i]) for f in RAW_FIELDS} for i in range(n)]
+
+
+def _worker(host, port, path, bodies, deadline, latencies, errors):
+    # Una connessione keep-alive per thread
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    i = 0
+    while time.perf_counter() < deadline:
+        body = bodies[i % len(bodies)]
+        i += 1
+        t = time.perf_counter()
+        try:
+            conn.request("POST", path, body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append("conn")
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - t)
+    conn.close()
+
+
+def run(host="127.0.0.1", port=8600, concurrency=8, duration=10.0, batch=1, seed=0):
+    rng = np.random.default_rng(seed)
+    if batch == 1:
+        path = "/score"
+        bodies = [json.dumps(r).encode() for r in _random_rows(rng, 1000)]
+    else:
+        path = "/score/batch"
+        bodies = [json.dumps({"rows": _random_rows(rng, batch)}).encode() for _ in range(20)]
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(host, port, path, bodies, deadline, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lat = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "rows": len(latencies) * batch,
+        "errors": len(errors),
+        "req_per_s": len(latencies) / elapsed,
+        "rows_per_s": len(latencies) * batch / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+        "p95_ms": float(np.percentile(lat, 95)) if len(lat) else None,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generatore di carico per utilis.scoring_server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=1, help="righe per richiesta (1 = /score)")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.host, args.port, args.concurrency, args.duration, args.batch), indent=2))
+
+
+if __name__ == "__main__":
+    main()
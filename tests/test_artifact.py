@@ -0,0 +1,51 @@
+import os
+import sys
+import pickle
+import shutil
+import pytest
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+from utilis.artifact import export_artifact, load_serving_engine, serving_version
+
+# Il .npz è servito solo se esportato dai pickle presenti; un riaddestramento che
+# riscrive solo i pickle deve cambiare versione e motore servito
+
+
+@pytest.fixture
+def paths(tmp_path):
+    for name in ("model.pkl", "scaler.pkl"):
+        shutil.copy2(os.path.join(ROOT, "model", name), tmp_path / name)
+    paths = tuple(str(tmp_path / name) for name in ("model.npz", "model.pkl", "scaler.pkl"))
+    with open(paths[1], "rb") as f:
+        model = pickle.load(f)
+    with open(paths[2], "rb") as f:
+        scaler = pickle.load(f)
+    export_artifact(model, scaler, paths[0], sources=paths[1:])
+    return paths
+
+
+def test_fresh_artifact_is_served(paths):
+    engine, version = load_serving_engine(*paths)
+    assert "sources" in engine.metadata
+    assert [v[0] for v in version] == [os.path.abspath(p) for p in paths]
+
+
+def test_retrained_pickles_replace_stale_artifact(paths):
+    before = serving_version(*paths)
+    with open(paths[1], "rb") as f:
+        model = pickle.load(f)
+    model.coef_ = model.coef_ * 2
+    with open(paths[1], "wb") as f:
+        pickle.dump(model, f)
+    os.utime(paths[1], ns=(before[1][1] + 10**9,) * 2)
+
+    engine, version = load_serving_engine(*paths)
+    assert not hasattr(engine, "metadata")  # motore dai pickle, non dal .npz
+    assert version != before
+
+
+def test_artifact_without_pickles_is_served(paths):
+    for p in paths[1:]:
+        os.remove(p)
+    engine, _ = load_serving_engine(*paths)
+    assert "sources" in engine.metadata
@@ -0,0 +1,69 @@
+import os
+import sys
+import numpy as np
+import pytest
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+from utilis.dataset import load_dataset
+from utilis.data_cube import DataCube, HIST_COLUMNS
+from utilis.bitmap_filter import BitmapIndex, BitmapSlice
+
+# Gli aggregati calcolati con popcount sui bitset devono coincidere con quelli
+# di un cubo costruito sulle righe selezionate
+
+DATA_PATH = os.path.join(ROOT, "data", "cardio_db.csv")
+
+SELECTIONS = [
+    ({"gender": [2], "cholesterol": [2, 3], "smoke": [0], "bp_band": [2, 3]}, (40, 60)),
+    ({"gluc": [3]}, (30, 65)),
+    ({}, (0, 200)),
+    ({"cardio": [1], "alco": [1]}, (50, 50)),
+]
+
+
+@pytest.fixture(scope="module")
+def data():
+    return load_dataset(DATA_PATH)
+
+
+@pytest.fixture(scope="module")
+def index(data):
+    return BitmapIndex(data)
+
+
+@pytest.mark.parametrize("equals, age_range", SELECTIONS)
+def test_slice_matches_cube_over_selection(data, index, equals, age_range):
+    bits = index.query(equals, {"age": age_range})
+    sel = BitmapSlice(index, bits, age_range)
+    ids = index.ids(bits)
+    cube = DataCube({c: data[c].to_numpy()[ids] for c in data.columns}).select()
+
+    assert sel.n == cube.n == len(ids)
+    assert sel.mean_age() == pytest.approx(cube.mean_age(), abs=1e-12)
+    assert sel.mean_bmi() == pytest.approx(cube.mean_bmi(), abs=1e-3)  # BMI in punto fisso
+    assert sel.cardio_rate() == pytest.approx(cube.cardio_rate(), abs=1e-12)
+
+    counts, edges = sel.histogram("age")
+    cube_counts, cube_edges = cube.histogram("age")
+    np.testing.assert_array_equal(counts, cube_counts)
+    np.testing.assert_array_equal(edges, cube_edges)
+    for name in ("incidence_by_age_band", "incidence_by_gender"):
+        a, b = getattr(sel, name)(), getattr(cube, name)()
+        assert list(a.iloc[:, 0]) == list(b.iloc[:, 0])
+        np.testing.assert_allclose(a["percentuale"], b["percentuale"])
+
+
+@pytest.mark.parametrize("equals, age_range", SELECTIONS)
+def test_fine_bins_match_rows(data, index, equals, age_range):
+    # Istogrammi sui bin fini dell'intero dataset, come il cubo genere × età
+    bits = index.query(equals, {"age": age_range})
+    sel = BitmapSlice(index, bits, age_range)
+    ids = index.ids(bits)
+    cardio = data["cardio"].to_numpy()[ids]
+    for col in HIST_COLUMNS:
+        edges = index.edges[col]
+        nb = len(edges) - 1
+        b = np.clip(np.searchsorted(edges, data[col].to_numpy()[ids], side="right") - 1, 0, nb - 1)
+        counts, cases = sel._hist(col)
+        np.testing.assert_array_equal(counts, np.bincount(b, minlength=nb))
+        np.testing.assert_array_equal(cases, np.bincount(b, weights=cardio, minlength=nb))
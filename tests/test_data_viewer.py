@@ -0,0 +1,31 @@
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utilis.data_viewer import DataViewer
+
+# Ordinamento stabile in entrambe le direzioni ed export CSV identico a pandas
+
+DATA = pd.DataFrame({"a": [3, 1, 3, 2, 1, 3, 2], "b": [0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5]})
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_sort_is_stable(descending):
+    viewer = DataViewer(DATA)
+    expected = DATA.sort_values("a", ascending=not descending, kind="stable").index.to_numpy()
+    np.testing.assert_array_equal(viewer.rows(sort_by="a", descending=descending), expected)
+
+    mask = DATA["b"].to_numpy() > 1
+    rows = viewer.rows(mask, sort_by="a", descending=descending)
+    np.testing.assert_array_equal(rows, expected[mask[expected]])
+
+
+def test_export_csv_matches_pandas():
+    viewer = DataViewer(DATA)
+    rows = viewer.rows(sort_by="a", descending=True)
+    exported = viewer.export_csv(rows, chunk_rows=3)
+    assert exported == DATA.iloc[rows].to_csv(index=False).encode()
+    assert viewer.export_csv(rows[:0]) == b"a,b\n"
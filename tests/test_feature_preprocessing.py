@@ -0,0 +1,71 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+from utilis.feature_preprocessing import FEATURES, RAW_FIELDS, preprocess_input, preprocess_batch
+
+# preprocess_batch deve restituire, riga per riga, esattamente le feature di preprocess_input
+
+DATA_PATH = os.path.join(ROOT, "data", "cardio_db.csv")
+SAMPLE_ROWS = 3000  # preprocess_input costa un DataFrame per riga: campione fisso, non tutto il dataset
+
+BASE = {"age": 50, "height": 170, "weight": 70.0, "ap_hi": 120, "ap_lo": 80,
+        "gender": 1, "cholesterol": 1, "gluc": 1, "smoke": 0, "alco": 0, "active": 1}
+
+
+def _rows(frame):
+    return np.vstack([
+        preprocess_input(*(getattr(r, c) for c in RAW_FIELDS)).to_numpy(dtype=np.float64)
+        for r in frame[RAW_FIELDS].itertuples(index=False)
+    ])
+
+
+def _assert_parity(frame):
+    batch = preprocess_batch(frame)
+    assert list(batch.columns) == FEATURES
+    assert batch.index.equals(frame.index)
+    np.testing.assert_array_equal(batch.to_numpy(), _rows(frame))
+    np.testing.assert_array_equal(preprocess_batch(frame, as_array=True), batch.to_numpy())
+
+
+def test_parity_on_dashboard_dataset():
+    # Campione con seme fisso di cardio_db.csv più le righe con i valori estremi di ogni campo
+    data = pd.read_csv(DATA_PATH)
+    edges = np.unique(np.concatenate([[data[c].idxmin(), data[c].idxmax()] for c in RAW_FIELDS]))
+    sample = data.sample(SAMPLE_ROWS, random_state=0).index
+    _assert_parity(data.loc[np.union1d(sample, edges)])
+
+
+@pytest.mark.parametrize("bmi", [18.5, 25, 30])
+def test_bmi_category_boundaries(bmi):
+    # Altezza 100 cm: BMI == peso, quindi i valori di soglia sono esatti
+    weights = [bmi - 1e-9, bmi, bmi + 1e-9]
+    frame = pd.DataFrame([{**BASE, "height": 100, "weight": w} for w in weights])
+    _assert_parity(frame)
+
+    X = preprocess_batch(frame)
+    expected = {
+        18.5: {"bmi_sottopeso": [1, 0, 0], "bmi_sovrappeso": [0, 0, 0], "bmi_obeso": [0, 0, 0]},
+        25: {"bmi_sottopeso": [0, 0, 0], "bmi_sovrappeso": [0, 1, 1], "bmi_obeso": [0, 0, 0]},
+        30: {"bmi_sottopeso": [0, 0, 0], "bmi_sovrappeso": [1, 0, 0], "bmi_obeso": [0, 1, 1]},
+    }[bmi]
+    for column, values in expected.items():
+        assert X[column].tolist() == values, column
+
+
+def test_categorical_dummies():
+    rows = [{**BASE, "gender": g, "cholesterol": c, "gluc": gl}
+            for g in (1, 2) for c in (1, 2, 3) for gl in (1, 2, 3)]
+    _assert_parity(pd.DataFrame(rows))
+
+
+def test_keyword_arrays_and_missing_fields():
+    frame = pd.DataFrame([BASE, {**BASE, "gender": 2, "weight": 95.5}])
+    by_keyword = preprocess_batch(as_array=True, **{c: frame[c].to_numpy() for c in RAW_FIELDS})
+    np.testing.assert_array_equal(by_keyword, _rows(frame))
+
+    with pytest.raises(ValueError):
+        preprocess_batch(age=[50])
@@ -0,0 +1,53 @@
+import os
+import sys
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+from utilis.feature_preprocessing import preprocess_batch
+from utilis.inference import FusedLogit
+
+# Il motore fuso deve riprodurre la pipeline sklearn (scaler + regressione logistica)
+
+MODEL_PATH = os.path.join(ROOT, "model", "model.pkl")
+SCALER_PATH = os.path.join(ROOT, "model", "scaler.pkl")
+DATA_PATH = os.path.join(ROOT, "data", "cardio_db.csv")
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    with open(SCALER_PATH, "rb") as f:
+        scaler = pickle.load(f)
+    return model, scaler
+
+
+@pytest.fixture(scope="module")
+def X():
+    return preprocess_batch(pd.read_csv(DATA_PATH))
+
+
+def test_fused_matches_sklearn(pipeline, X):
+    model, scaler = pipeline
+    engine = FusedLogit.from_sklearn(model, scaler)
+    Xs = scaler.transform(X)
+
+    proba, pred = engine.predict(X.to_numpy())
+    assert np.allclose(proba, model.predict_proba(Xs)[:, 1], atol=1e-12)
+    np.testing.assert_array_equal(pred, model.predict(Xs))
+
+
+def test_single_row_matches_batch(pipeline, X):
+    engine = FusedLogit.from_sklearn(*pipeline)
+    row = X.to_numpy()[0]
+    proba, pred = engine.predict(row)
+    batch_proba, batch_pred = engine.predict(X.to_numpy()[:1])
+    assert proba == batch_proba[0] and pred == batch_pred[0]
+
+
+def test_feature_count_mismatch():
+    with pytest.raises(ValueError):
+        FusedLogit(np.ones(3), 0.0)
@@ -0,0 +1,36 @@
+import os
+import sys
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from utilis.scoring_server import RequestError, _columns
+
+# Validazione dei record JSON prima dello scoring: 400 con il nome del campo
+
+ROW = {"age": 50, "height": 170, "weight": 70.0, "ap_hi": 120, "ap_lo": 80,
+       "gender": 1, "cholesterol": 1, "gluc": 1, "smoke": 0, "alco": 0, "active": 1}
+
+
+def test_valid_rows():
+    columns = _columns([ROW, {**ROW, "gender": 2, "weight": 95.5}])
+    assert columns["weight"] == [70.0, 95.5]
+    assert columns["gender"] == [1.0, 2.0]
+
+
+@pytest.mark.parametrize("field, value", [
+    ("age", float("nan")), ("age", float("inf")), ("age", 10 ** 400), ("age", "50"),
+    ("smoke", True), ("height", 0), ("weight", -5), ("ap_hi", -120), ("gender", 3),
+])
+def test_invalid_values_name_the_field(field, value):
+    with pytest.raises(RequestError) as e:
+        _columns([ROW, {**ROW, field: value}])
+    assert e.value.status == 400
+    assert field in str(e.value) and "Riga 1" in str(e.value)
+
+
+def test_missing_field_and_bad_rows():
+    with pytest.raises(RequestError, match="gluc"):
+        _columns([{k: v for k, v in ROW.items() if k != "gluc"}])
+    with pytest.raises(RequestError):
+        _columns([ROW, "x"])
+    with pytest.raises(RequestError):
+        _columns([])
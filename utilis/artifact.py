@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import logging
+import hashlib
+import argparse
+import numpy as np
+
+from utilis.feature_preprocessing import FEATURES
+from utilis.inference import MODEL_PATH, SCALER_PATH, FusedLogit, load_engine, model_version
+
+# Artefatto compatto e versionato: solo NumPy al caricamento, niente sklearn né pickle
+ARTIFACT_PATH = "model/model.npz"
+FORMAT_VERSION = 1
+_ARRAYS = ("coef", "intercept", "mean", "scale", "classes", "features")
+
+logger = logging.getLogger("cardio.artifact")
+
+
+def _checksum(arrays, metadata):
+    h = hashlib.sha256()
+    for name in _ARRAYS:
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(arrays[name]).tobytes())
+    h.update(metadata.encode())
+    return h.hexdigest()
+
+
+def _source_hashes(model_path, scaler_path):
+    # sha256 dei pickle di origine (il contenuto, non l'mtime: sopravvive a checkout e copie)
+    out = {}
+    for name, path in (("model", model_path), ("scaler", scaler_path)):
+        with open(path, "rb") as f:
+            out[name] = hashlib.sha256(f.read()).hexdigest()
+    return out
+
+
+def export_artifact(model, scaler, path=ARTIFACT_PATH, sources=None, **extra_metadata):
+    # Coefficienti, intercetta, media/scala dello scaler e ordine delle FEATURES in un .npz.
+    # sources = (model.pkl, scaler.pkl) da cui provengono model e scaler: i loro sha256
+    # finiscono nei metadati e permettono di riconoscere un .npz non più allineato
+    import sklearn
+
+    features = list(getattr(scaler, "feature_names_in_", FEATURES))
+    n = len(features)
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+
+    arrays = {
+        "coef": np.asarray(model.coef_, dtype=np.float64).ravel(),
+        "intercept": np.asarray(model.intercept_, dtype=np.float64).ravel()[:1],
+        "mean": np.zeros(n) if mean is None else np.asarray(mean, dtype=np.float64),
+        "scale": np.ones(n) if scale is None else np.asarray(scale, dtype=np.float64),
+        "classes": np.asarray(model.classes_, dtype=np.int64),
+        "features": np.array(features, dtype=str),
+    }
+    metadata = json.dumps({
+        "format": FORMAT_VERSION,
+        "model_type": type(model).__name__,
+        "scaler_type": type(scaler).__name__,
+        "sklearn_version": sklearn.__version__,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **({"sources": _source_hashes(*sources)} if sources else {}),
+        **extra_metadata,
+    }, sort_keys=True)
+
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, metadata=np.array(metadata), checksum=np.array(_checksum(arrays, metadata)), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def load_artifact(path=ARTIFACT_PATH):
+    # FusedLogit dal .npz, con verifica di checksum, formato e ordine delle feature
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in _ARRAYS}
+        metadata = str(data["metadata"])
+        checksum = str(data["checksum"])
+
+    if _checksum(arrays, metadata) != checksum:
+        raise ValueError(f"Checksum non valido per {path}")
+    meta = json.loads(metadata)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Formato {meta.get('format')} non supportato in {path}")
+    if list(arrays["features"]) != FEATURES:
+        raise ValueError(f"Ordine delle feature in {path} diverso da FEATURES")
+
+    coef = arrays["coef"] / arrays["scale"]
+    intercept = arrays["intercept"][0] - np.dot(coef, arrays["mean"])
+    engine = FusedLogit(coef, intercept, classes=arrays["classes"], features=arrays["features"],
+                        mean=arrays["mean"])
+    engine.metadata = meta
+    return engine
+
+
+def is_stale(engine, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    # True se i pickle esistono e non sono quelli da cui è stato esportato l'artefatto
+    # (es. riaddestramento senza riesportare il .npz, o .npz senza sha256 di origine)
+    if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
+        return False
+    return engine.metadata.get("sources") != _source_hashes(model_path, scaler_path)
+
+
+def load_serving_engine(artifact_path=ARTIFACT_PATH, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    # (motore, versione): l'artefatto .npz se presente e allineato ai pickle, altrimenti i pickle sklearn
+    version = serving_version(artifact_path, model_path, scaler_path)
+    if os.path.exists(artifact_path):
+        engine = load_artifact(artifact_path)
+        if not is_stale(engine, model_path, scaler_path):
+            return engine, version
+        logger.warning("%s non corrisponde a %s + %s: uso i pickle (riesportare con python -m utilis.artifact)",
+                       artifact_path, model_path, scaler_path)
+    return load_engine(model_path, scaler_path), version
+
+
+def serving_version(artifact_path=ARTIFACT_PATH, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    # Firma (solo stat) di .npz e pickle: anche un riaddestramento che riscrive solo i
+    # pickle cambia la versione (e quindi il motore servito, vedi is_stale)
+    paths = [p for p in (artifact_path, model_path, scaler_path) if os.path.exists(p)]
+    return model_version(*paths) if paths else model_version(model_path, scaler_path)
+
+
+def main():
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Esporta model.pkl + scaler.pkl in un artefatto .npz compatto")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--scaler", default=SCALER_PATH)
+    parser.add_argument("--out", default=ARTIFACT_PATH)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    with open(args.scaler, "rb") as f:
+        scaler = pickle.load(f)
+    export_artifact(model, scaler, args.out, sources=(args.model, args.scaler))
+
+    engine = load_artifact(args.out)
+    print(f"Esportato {args.out}: {len(engine.coef)} feature, {engine.metadata}")
+
+
+if __name__ == "__main__":
+    main()
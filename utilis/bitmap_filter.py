@@ -0,0 +1,211 @@
+import numpy as np
+
+from utilis.data_cube import HIST_COLUMNS, FINE_BINS, CubeSlice, _bin_edges
+
+# Indice bitmap per i filtri della dashboard: un bitset compresso (64 righe per
+# parola uint64) per ogni valore delle colonne categoriche e delle fasce BMI/pressione,
+# bitset cumulativi (valore <= v) per l'età. Ogni combinazione di filtri è un AND
+# tra colonne di OR tra valori, e il conteggio è un popcount.
+# Gli aggregati della dashboard (KPI, istogrammi, incidenze) vengono da codici
+# bit-sliced: un bitset per ogni bit dell'età e del bin fine di ogni colonna.
+
+CATEGORICAL = ["gender", "cholesterol", "gluc", "smoke", "alco", "active", "cardio"]
+RANGED = ["age"]
+
+# Fasce BMI: stesse soglie delle dummy bmi_* in feature_preprocessing
+BMI_BANDS = ["sottopeso", "normopeso", "sovrappeso", "obeso"]
+BMI_THRESHOLDS = [18.5, 25, 30]
+
+# Fasce di pressione (ESC/ESH): vale la peggiore tra sistolica e diastolica
+BP_BANDS = ["ottimale", "normale", "normale-alta", "ipertensione 1", "ipertensione 2", "ipertensione 3"]
+AP_HI_THRESHOLDS = [120, 130, 140, 160, 180]
+AP_LO_THRESHOLDS = [80, 85, 90, 100, 110]
+
+BMI_SCALE = 1 << 10  # BMI in punto fisso per la media (errore < 0.001)
+SPARSE_RATIO = 4     # bitset ridotti alle parole non nulle sotto 1/4 di parole occupate
+
+
+def bmi_band(bmi):
+    # Indice in BMI_BANDS
+    return np.searchsorted(BMI_THRESHOLDS, np.asarray(bmi, dtype=np.float64), side="right")
+
+
+def bp_band(ap_hi, ap_lo):
+    # Indice in BP_BANDS
+    hi = np.searchsorted(AP_HI_THRESHOLDS, np.asarray(ap_hi), side="right")
+    lo = np.searchsorted(AP_LO_THRESHOLDS, np.asarray(ap_lo), side="right")
+    return np.maximum(hi, lo)
+
+
+class BitmapIndex:
+    # Costruito una volta per versione del dataset e condiviso tra sessioni
+
+    def __init__(self, data, categorical=CATEGORICAL, ranged=RANGED, fine_bins=FINE_BINS):
+        self.n = len(data[categorical[0]])
+        self.words = (self.n + 63) // 64
+        self.all = self._pack(np.ones(self.n, dtype=bool))
+
+        columns = {c: np.asarray(data[c]) for c in categorical}
+        columns["bmi_band"] = bmi_band(data["BMI"])
+        columns["bp_band"] = bp_band(data["ap_hi"], data["ap_lo"])
+
+        # Uguaglianza: {colonna: {valore: bitset}}
+        self.bitmaps = {}
+        for c, values in columns.items():
+            self.bitmaps[c] = {v.item(): self._pack(values == v) for v in np.unique(values)}
+
+        # Intervalli: valori ordinati e bitset cumulativi (righe con valore <= v)
+        self.ranges = {}
+        for c in ranged:
+            values = np.asarray(data[c])
+            levels = np.unique(values)
+            cumulative = np.empty((len(levels), self.words), dtype=np.uint64)
+            acc = np.zeros(self.words, dtype=np.uint64)
+            for i, v in enumerate(levels):
+                acc |= self._pack(values == v)
+                cumulative[i] = acc
+            self.ranges[c] = (levels, cumulative)
+
+        # Aggregati: {colonna: fette}, fetta i = bit (dal più significativo) del codice di
+        # ogni riga; età in anni dal minimo, colonne degli istogrammi nei bin fini del cubo
+        age = np.asarray(data["age"]).astype(np.int64)
+        self.ages = np.arange(age.min(), age.max() + 1)
+        self.slices = {"age": self._slices(age - self.ages[0])}
+        self.edges = {}
+        for col in HIST_COLUMNS:
+            values = np.asarray(data[col])
+            edges = _bin_edges(values.min(), values.max(), np.issubdtype(values.dtype, np.integer), fine_bins)
+            nb = len(edges) - 1
+            self.edges[col] = edges
+            self.slices[col] = self._slices(np.clip(np.searchsorted(edges, values, side="right") - 1, 0, nb - 1))
+        self.slices["BMI_fixed"] = self._slices(np.rint(np.asarray(data["BMI"]) * BMI_SCALE).astype(np.int64))
+
+    def _pack(self, mask):
+        # bool[n] -> uint64[words], bit i della parola k = riga 64k + i
+        packed = np.packbits(mask, bitorder="little")
+        out = np.zeros(self.words * 8, dtype=np.uint8)
+        out[:len(packed)] = packed
+        return out.view(np.uint64)
+
+    def _slices(self, codes):
+        # Codici interi >= 0 -> uint64[bit, words], dal bit più significativo
+        n_bits = max(1, int(codes.max()).bit_length()) if len(codes) else 1
+        return np.stack([self._pack((codes >> k) & 1 == 1) for k in range(n_bits - 1, -1, -1)])
+
+    def values(self, column):
+        return list(self.bitmaps[column])
+
+    def equals(self, column, values):
+        # Righe con column in values (OR dei bitset)
+        out = np.zeros(self.words, dtype=np.uint64)
+        for v in values:
+            bits = self.bitmaps[column].get(v)
+            if bits is not None:
+                out |= bits
+        return out
+
+    def between(self, column, lo, hi):
+        # Righe con lo <= column <= hi: cumulativo(hi) AND NOT cumulativo(< lo)
+        levels, cumulative = self.ranges[column]
+        i_hi = np.searchsorted(levels, hi, side="right") - 1
+        i_lo = np.searchsorted(levels, lo, side="left") - 1
+        if i_hi < 0:
+            return np.zeros(self.words, dtype=np.uint64)
+        if i_lo < 0:
+            return cumulative[i_hi].copy()
+        return cumulative[i_hi] & ~cumulative[i_lo]
+
+    def query(self, equals=None, ranges=None):
+        # equals: {colonna: valori ammessi} (lista vuota = nessun vincolo)
+        # ranges: {colonna: (min, max)}
+        out = self.all.copy()
+        for column, values in (equals or {}).items():
+            if values:
+                out &= self.equals(column, values)
+        for column, (lo, hi) in (ranges or {}).items():
+            out &= self.between(column, lo, hi)
+        return out
+
+    def count(self, bits):
+        return int(np.bitwise_count(bits).sum())
+
+    def mask(self, bits):
+        # bitset -> maschera booleana sulle righe
+        return np.unpackbits(bits.view(np.uint8), count=self.n, bitorder="little").view(bool)
+
+    def ids(self, bits):
+        # Indici delle righe selezionate
+        return np.flatnonzero(self.mask(bits))
+
+    # ---- Aggregati sulle righe di un bitset, senza espanderle
+    def code_counts(self, bits, column):
+        # (righe, casi cardio) per codice di column: discesa in profondità sulle fette,
+        # dal bit più significativo (figlio 1 = nodo AND fetta, figlio 0 = nodo XOR figlio 1),
+        # popcount alle foglie. I sottoalberi vuoti vengono saltati e i nodi sparsi ridotti
+        # alle sole parole non nulle, quindi il costo scende con la selettività.
+        slices = self.slices[column]
+        cardio = self.bitmaps["cardio"].get(1, np.zeros(self.words, dtype=np.uint64))
+        counts = np.zeros((2, 1 << len(slices)), dtype=np.int64)
+        self._descend(bits, slices, cardio, 0, counts)
+        return counts[0], counts[1]
+
+    def _descend(self, node, slices, cardio, code, counts):
+        occupied = np.count_nonzero(node)
+        if not occupied:
+            return
+        if occupied < len(node) // SPARSE_RATIO:
+            keep = np.flatnonzero(node)
+            node, slices, cardio = node[keep], slices[:, keep], cardio[keep]
+        if not len(slices):
+            counts[0, code] = self.count(node)
+            counts[1, code] = self.count(node & cardio)
+            return
+        one = node & slices[0]
+        self._descend(node ^ one, slices[1:], cardio, code * 2, counts)
+        self._descend(one, slices[1:], cardio, code * 2 + 1, counts)
+
+    def sliced_sum(self, bits, column):
+        # Somma dei codici di column sulle righe di bits: Σ 2^k · popcount(bits AND bit k)
+        slices = self.slices[column]
+        weights = 1 << np.arange(len(slices) - 1, -1, -1, dtype=np.int64)
+        return int(sum(int(w) * self.count(bits & s) for w, s in zip(weights, slices)))
+
+
+class BitmapSlice(CubeSlice):
+    # Stessa interfaccia di CubeSlice (KPI, istogrammi, incidenze) per una combinazione
+    # qualsiasi di filtri: conteggi per età, bin fine e genere come popcount sui bitset
+    # dell'indice, stessi bin fini del cubo
+
+    def __init__(self, index, bits, age_range=None):
+        lo, hi = int(index.ages[0]), int(index.ages[-1])
+        if age_range is not None:
+            lo, hi = max(lo, age_range[0]), min(hi, age_range[1])
+        self.ages = np.arange(lo, hi + 1)
+        self.n = index.count(bits)
+
+        count, cardio = index.code_counts(bits, "age")
+        span = slice(lo - int(index.ages[0]), max(lo, hi + 1) - int(index.ages[0]))
+        self.count_by_age, self.cardio_by_age = count[span], cardio[span].astype(np.float64)
+        self._bmi_sum = index.sliced_sum(bits, "BMI_fixed") / BMI_SCALE
+
+        self.edges = index.edges
+        self.hists = {}
+        for col in HIST_COLUMNS:
+            nb = len(self.edges[col]) - 1
+            count, cardio = index.code_counts(bits, col)
+            self.hists[col] = (count[:nb], cardio[:nb].astype(np.float64))
+
+        cardio = index.bitmaps["cardio"].get(1, np.zeros(index.words, dtype=np.uint64))
+        self.genders = np.array(index.values("gender"), dtype=np.int64)
+        self.gender_counts = np.array([index.count(bits & index.bitmaps["gender"][g]) for g in self.genders])
+        self.gender_cardio = np.array([index.count(bits & index.bitmaps["gender"][g] & cardio)
+                                       for g in self.genders], dtype=np.float64)
+
+    def _edges(self, col):
+        return self.edges[col]
+
+    def _hist(self, col):
+        return self.hists[col]
+
+    def _by_gender(self):
+        return self.genders, self.gender_counts, self.gender_cardio
@@ -0,0 +1,117 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Grafici da aggregati calcolati sul server: nelle figure finiscono solo conteggi e
+# statistiche, quindi il payload inviato al browser non dipende dal numero di righe
+MAX_OUTLIERS = 200
+
+
+def histogram_counts(values, bins=30, range=None):
+    # (conteggi, bordi dei bin) come np.histogram, ignorando i NaN
+    values = np.asarray(values, dtype=np.float64)
+    return np.histogram(values[~np.isnan(values)], bins=bins, range=range)
+
+
+def histogram_figure(counts, edges, color, title=None, xaxis_title=None, name=None):
+    # Barre contigue centrate sui bin (stesso aspetto di px.histogram)
+    edges = np.asarray(edges, dtype=np.float64)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+        marker_color=color, name=name, showlegend=False
+    ))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title="count", bargap=0)
+    return fig
+
+
+def box_stats(values, max_outliers=MAX_OUTLIERS):
+    # Quartili (interpolazione lineare, come plotly), baffi al dato più estremo entro
+    # 1.5 × IQR e un campione di al più max_outliers outlier (estremi sempre inclusi)
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+
+    outliers = np.sort(values[~inside])
+    if len(outliers) > max_outliers:
+        outliers = outliers[np.unique(np.linspace(0, len(outliers) - 1, max_outliers).round().astype(int))]
+
+    return {
+        "n": len(values),
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(values[inside].min()),
+        "upperfence": float(values[inside].max()),
+        "mean": float(values.mean()),
+        "outliers": outliers,
+    }
+
+
+def box_stats_from_counts(values, counts, max_outliers=MAX_OUTLIERS):
+    # Come box_stats, ma da un conteggio per valore (es. GROUP BY su SQL): stesse
+    # statistiche senza espandere le righe
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    keep = ~np.isnan(values) & (counts > 0)
+    values, counts = values[keep], counts[keep]
+    order = np.argsort(values, kind="stable")
+    values, counts = values[order], counts[order]
+    n = int(counts.sum())
+    if not n:
+        return None
+
+    cum = np.cumsum(counts)
+    at = lambda pos: values[np.searchsorted(cum, pos, side="right")]  # pos-esimo valore ordinato
+
+    def quantile(q):
+        h = (n - 1) * q
+        lo = int(np.floor(h))
+        return float(at(lo) + (h - lo) * (at(min(lo + 1, n - 1)) - at(lo)))
+
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+
+    out_values, out_cum = values[~inside], np.cumsum(counts[~inside])
+    n_out = int(out_cum[-1]) if len(out_cum) else 0
+    positions = np.arange(n_out)
+    if n_out > max_outliers:
+        positions = np.unique(np.linspace(0, n_out - 1, max_outliers).round().astype(int))
+
+    return {
+        "n": n,
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": float(values[inside].min()),
+        "upperfence": float(values[inside].max()),
+        "mean": float((values * counts).sum() / n),
+        "outliers": out_values[np.searchsorted(out_cum, positions, side="right")],
+    }
+
+
+def box_figure(groups, colors, title=None, xaxis_title=None, yaxis_title=None):
+    # Un box per gruppo da statistiche precalcolate: groups = {etichetta: box_stats(...)}
+    fig = go.Figure()
+    for (label, stats), color in zip(groups.items(), colors):
+        if stats is None:
+            continue
+        label = str(label)
+        fig.add_trace(go.Box(
+            x=[label], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+            lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+            mean=[stats["mean"]], name=label, marker_color=color, boxpoints=False,
+        ))
+        if len(stats["outliers"]):
+            fig.add_trace(go.Scatter(
+                x=[label] * len(stats["outliers"]), y=stats["outliers"], mode="markers",
+                marker=dict(color=color, size=4), name=label, showlegend=False,
+                hovertemplate="%{y}<extra></extra>",
+            ))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title,
+                      xaxis_type="category", showlegend=False)
+    return fig
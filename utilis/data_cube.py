@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+# Colonne con istogramma per cella (l'età coincide con la chiave del cubo)
+HIST_COLUMNS = ["BMI", "ap_hi", "cholesterol", "gluc"]
+
+FINE_BINS = 200
+AGE_BANDS = [0, 30, 45, 60, 75, 120]
+GENDER_LABELS = {1: "Donna", 2: "Uomo"}
+
+
+def _bin_edges(lo, hi, integer, fine_bins):
+    # Colonne intere con pochi valori: un bin per valore; altrimenti bin fini uniformi
+    lo, hi = float(lo), float(hi)
+    if integer and hi - lo <= 512:
+        return np.arange(lo - 0.5, hi + 1.5)
+    if hi == lo:
+        hi = lo + 1
+    return np.linspace(lo, hi, fine_bins + 1)
+
+
+def _merge_bins(counts, edges, nbins):
+    # Accorpa i bin fini (tolti quelli vuoti agli estremi) in circa nbins bin
+    nz = np.flatnonzero(counts)
+    if len(nz) == 0:
+        return counts[:0], edges[:1]
+    counts = counts[nz[0]:nz[-1] + 1]
+    edges = edges[nz[0]:nz[-1] + 2]
+
+    step = max(1, int(np.ceil(len(counts) / nbins)))
+    starts = np.arange(0, len(counts), step)
+    merged = np.add.reduceat(counts, starts)
+    merged_edges = np.append(edges[starts], edges[-1])
+    return merged, merged_edges
+
+
+def _incidence(col, labels, counts, cardio):
+    # Stesso formato di percentuali() nella dashboard (solo gruppi non vuoti)
+    keep = counts > 0
+    rate = cardio[keep] / counts[keep]
+    return pd.DataFrame({
+        col: np.asarray(labels, dtype=object)[keep],
+        "cardio": rate,
+        "percentuale": rate * 100,
+    })
+
+
+class DataCube:
+    # Cubo pre-aggregato genere × età intera, costruito una volta per versione
+    # del dataset: conteggi, somme di cardio/BMI e istogrammi fini per cella.
+    # I filtri della dashboard diventano somme di fette del cubo, quindi il
+    # costo non dipende più dal numero di righe.
+
+    def __init__(self, data, fine_bins=FINE_BINS):
+        gender = np.asarray(data["gender"])
+        age = np.asarray(data["age"]).astype(np.int64)
+        cardio = np.asarray(data["cardio"], dtype=np.float64)
+
+        self.genders = np.unique(gender)
+        self.ages = np.arange(age.min(), age.max() + 1)
+        shape = (len(self.genders), len(self.ages))
+        n_cells = shape[0] * shape[1]
+
+        cell = np.searchsorted(self.genders, gender) * shape[1] + (age - self.ages[0])
+
+        self.count = np.bincount(cell, minlength=n_cells).reshape(shape)
+        self.cardio = np.bincount(cell, weights=cardio, minlength=n_cells).reshape(shape)
+        self.bmi_sum = np.bincount(
+            cell, weights=np.asarray(data["BMI"], dtype=np.float64), minlength=n_cells
+        ).reshape(shape)
+
+        self.edges = {}
+        self.hist = {}
+        self.hist_cardio = {}
+        for col in HIST_COLUMNS:
+            values = np.asarray(data[col])
+            edges = _bin_edges(values.min(), values.max(), np.issubdtype(values.dtype, np.integer), fine_bins)
+            nb = len(edges) - 1
+            b = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, nb - 1)
+            key = cell * nb + b
+
+            self.edges[col] = edges
+            self.hist[col] = np.bincount(key, minlength=n_cells * nb).reshape(shape + (nb,))
+            self.hist_cardio[col] = np.bincount(
+                key, weights=cardio, minlength=n_cells * nb
+            ).reshape(shape + (nb,))
+
+    def select(self, genders=None, age_range=None):
+        gmask = np.ones(len(self.genders), dtype=bool)
+        if genders:
+            gmask = np.isin(self.genders, genders)
+
+        amask = np.ones(len(self.ages), dtype=bool)
+        if age_range is not None:
+            amask = (self.ages >= age_range[0]) & (self.ages <= age_range[1])
+
+        return CubeSlice(self, gmask, amask)
+
+
+class CubeSlice:
+    # Aggregati di una selezione (genere, intervallo d'età) del cubo
+
+    def __init__(self, cube, gmask, amask):
+        self.cube = cube
+        self.gmask = gmask
+        self.amask = amask
+        self.ages = cube.ages[amask]
+
+        sub = np.ix_(gmask, amask)
+        self.count_by_age = cube.count[sub].sum(axis=0)
+        self.cardio_by_age = cube.cardio[sub].sum(axis=0)
+        self.n = int(self.count_by_age.sum())
+        self._bmi_sum = cube.bmi_sum[sub].sum()
+
+    def _sum(self, arr):
+        return arr[np.ix_(self.gmask, self.amask)].sum(axis=(0, 1))
+
+    # Aggregati per bin fine e per genere: unico punto in cui si leggono le celle del cubo
+    def _edges(self, col):
+        return self.cube.edges[col]
+
+    def _hist(self, col):
+        # (conteggi, casi cardio) per bin fine di col
+        return self._sum(self.cube.hist[col]), self._sum(self.cube.hist_cardio[col])
+
+    def _by_gender(self):
+        # (generi, conteggi, casi cardio)
+        sub = np.ix_(self.gmask, self.amask)
+        return self.cube.genders[self.gmask], self.cube.count[sub].sum(axis=1), self.cube.cardio[sub].sum(axis=1)
+
+    # ---- Indicatori principali
+    def mean_age(self):
+        return float((self.ages * self.count_by_age).sum() / self.n) if self.n else np.nan
+
+    def mean_bmi(self):
+        return float(self._bmi_sum / self.n) if self.n else np.nan
+
+    def cardio_rate(self):
+        return float(self.cardio_by_age.sum() / self.n) if self.n else np.nan
+
+    # ---- Istogrammi: (conteggi, bordi dei bin)
+    def histogram(self, col, nbins=30):
+        if col == "age":
+            edges = np.append(self.ages - 0.5, self.ages[-1] + 0.5) if len(self.ages) else np.array([0.0])
+            return _merge_bins(self.count_by_age, edges, nbins)
+        return _merge_bins(self._hist(col)[0], self._edges(col), nbins)
+
+    # ---- Incidenza cardio (%) per gruppo
+    def incidence_by_age_band(self, bands=AGE_BANDS):
+        idx = np.searchsorted(bands, self.ages, side="left") - 1  # intervalli (a, b]
+        nb = len(bands) - 1
+        valid = (idx >= 0) & (idx < nb)
+        counts = np.bincount(idx[valid], weights=self.count_by_age[valid], minlength=nb)
+        cardio = np.bincount(idx[valid], weights=self.cardio_by_age[valid], minlength=nb)
+        labels = [f"({bands[i]}, {bands[i + 1]}]" for i in range(nb)]
+        return _incidence("fasce_età", labels, counts, cardio)
+
+    def incidence_by_gender(self):
+        genders, counts, cardio = self._by_gender()
+        return _incidence("gender", genders, counts, cardio)
+
+    def incidence_by(self, col):
+        # Colonne con un bin per valore (es. gluc, cholesterol)
+        counts, cardio = self._hist(col)
+        edges = self._edges(col)
+        labels = np.rint((edges[:-1] + edges[1:]) / 2).astype(int)
+        return _incidence(col, labels, counts, cardio)
+
+    def incidence_by_quantile(self, col, q=4):
+        # Fasce a quantili calcolate sui bin fini (risoluzione = larghezza del bin)
+        counts, cardio = self._hist(col)
+        edges = self._edges(col)
+        if counts.sum() == 0:
+            return _incidence(f"fasce_{col}", [], counts[:0], cardio[:0])
+
+        cum = np.cumsum(counts) / counts.sum()
+        group = np.minimum(np.searchsorted(np.arange(1, q) / q, cum, side="left"), q - 1)
+        g_counts = np.bincount(group, weights=counts, minlength=q)
+        g_cardio = np.bincount(group, weights=cardio, minlength=q)
+
+        labels = []
+        for g in range(q):
+            bins = np.flatnonzero((group == g) & (counts > 0))
+            if len(bins) == 0:
+                labels.append("")
+                continue
+            labels.append(f"({edges[bins[0]]:.2f}, {edges[bins[-1] + 1]:.2f}]")
+        return _incidence(f"fasce_{col}", labels, g_counts, g_cardio)
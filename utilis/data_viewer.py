@@ -0,0 +1,69 @@
+import io
+import math
+import threading
+import numpy as np
+
+# Visualizzatore a pagine: ordinamento e paginazione sul server, nel browser arriva
+# solo la fetta della pagina corrente (mai l'intero insieme filtrato)
+PAGE_SIZES = (25, 50, 100, 500)
+EXPORT_CHUNK_ROWS = 200_000
+
+
+class DataViewer:
+    # Costruito una volta per versione del dataset e condiviso tra sessioni:
+    # colonne come array NumPy e argsort per colonna, calcolato al primo uso e riutilizzato
+
+    def __init__(self, data):
+        self.columns = list(data.columns) if hasattr(data, "columns") else list(data)
+        self.data = {c: np.asarray(data[c]) for c in self.columns}
+        self.n = len(self.data[self.columns[0]]) if self.columns else 0
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def order(self, column, descending=False):
+        # Indici delle righe ordinate per column; stabile in entrambe le direzioni
+        # (a parità di valore resta l'ordine delle righe, anche in decrescente)
+        with self._lock:
+            key = (column, descending)
+            if key not in self._orders:
+                values = self.data[column]
+                if descending:
+                    # argsort stabile sull'array rovesciato, poi rovesciato di nuovo
+                    self._orders[key] = (self.n - 1 - np.argsort(values[::-1], kind="stable"))[::-1]
+                else:
+                    self._orders[key] = np.argsort(values, kind="stable")
+            return self._orders[key]
+
+    def rows(self, mask=None, sort_by=None, descending=False):
+        # Indici delle righe selezionate da mask, nell'ordine richiesto
+        mask = None if mask is None else np.asarray(mask, dtype=bool)
+        if sort_by is None:
+            idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+            return idx[::-1] if descending else idx
+        idx = self.order(sort_by, descending)
+        return idx if mask is None else idx[mask[idx]]
+
+    def n_pages(self, rows, page_size):
+        return max(1, math.ceil(len(rows) / page_size))
+
+    def page(self, rows, page, page_size):
+        # DataFrame della sola pagina richiesta (pagine numerate da 1)
+        import pandas as pd
+
+        start = (page - 1) * page_size
+        idx = rows[start:start + page_size]
+        return pd.DataFrame({c: self.data[c][idx] for c in self.columns}, index=idx)
+
+    def export_csv(self, rows, chunk_rows=EXPORT_CHUNK_ROWS):
+        # Bytes del CSV delle righe selezionate, costruito in memoria (st.download_button
+        # li vuole comunque interi): i blocchi evitano solo un DataFrame con tutte le righe
+        import pandas as pd
+
+        buf = io.BytesIO()
+        for start in range(0, len(rows), chunk_rows):
+            idx = rows[start:start + chunk_rows]
+            chunk = pd.DataFrame({c: self.data[c][idx] for c in self.columns})
+            chunk.to_csv(buf, header=start == 0, index=False, encoding="utf-8")
+        if not len(rows):
+            buf.write((",".join(self.columns) + "\n").encode())
+        return buf.getvalue()
@@ -0,0 +1,207 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+# pandas (e l'ETL che lo usa) importati solo per costruire la cache o il DataFrame:
+# load_columns con cache calda richiede solo NumPy
+
+DATA_PATH = "data/cardio_db.csv"
+CACHE_DIR = os.path.join("data", ".cache")
+
+
+# Tipi compatti per colonna (le colonne non elencate mantengono il tipo letto)
+DTYPES = {
+    "id": np.int64,
+    "age": np.int16,
+    "gender": np.int8,
+    "height": np.int16,
+    "weight": np.float64,
+    "ap_hi": np.int16,
+    "ap_lo": np.int16,
+    "cholesterol": np.int8,
+    "gluc": np.int8,
+    "smoke": np.int8,
+    "alco": np.int8,
+    "active": np.int8,
+    "cardio": np.int8,
+    "BMI": np.float64,
+}
+
+CHUNK_ROWS = 500_000
+FORMAT_VERSION = 1
+
+
+def dataset_version(path=DATA_PATH):
+    # Firma economica (solo stat) usata come chiave di cache nelle pagine
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_dir(path, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, stem)
+
+
+def _read_meta(target):
+    try:
+        with open(os.path.join(target, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(target, meta):
+    tmp = os.path.join(target, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(target, "meta.json"))
+
+
+def clean_chunk(df):
+    # Regole di pulizia del dataset della dashboard
+    # (filtro BMI: stessa regola dell'ETL, applicata una sola volta alla costruzione della cache)
+    from utilis.etl import BMI_MIN, BMI_MAX
+
+    df = df.dropna()
+    if "BMI" in df.columns:
+        df = df[(df["BMI"] > BMI_MIN) & (df["BMI"] < BMI_MAX)]
+    return df
+
+
+def _touch(path, target, signature):
+    # mtime cambiato (es. checkout git) ma stesso contenuto: aggiorna solo la firma nei
+    # metadati invece di ricostruire. True se la cache esistente è stata riutilizzata
+    meta = _read_meta(target)
+    if meta is None or meta.get("format") != FORMAT_VERSION:
+        return False
+    if meta["size"] != signature[2] or meta["sha256"] != _file_hash(path):
+        return False
+    meta["mtime_ns"] = signature[1]
+    _write_meta(target, meta)
+    return True
+
+
+def build_cache(path=DATA_PATH, cache_dir=CACHE_DIR):
+    # CSV -> un file .npy tipizzato per colonna, letto a blocchi
+    import pandas as pd
+
+    target = _cache_dir(path, cache_dir)
+    signature = dataset_version(path)
+    if _touch(path, target, signature):
+        return target
+
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    parts = {}
+    for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS):
+        chunk = clean_chunk(chunk)
+        for c in chunk.columns:
+            dtype = DTYPES.get(c, chunk[c].dtype)
+            parts.setdefault(c, []).append(chunk[c].to_numpy(dtype=dtype))
+
+    columns = list(parts)
+    n_rows = 0
+    for c in columns:
+        arr = np.concatenate(parts.pop(c))
+        n_rows = len(arr)
+        np.save(os.path.join(tmp, f"{c}.npy"), arr)
+
+    _write_meta(tmp, {
+        "format": FORMAT_VERSION,
+        "source": os.path.abspath(path),
+        "mtime_ns": signature[1],
+        "size": signature[2],
+        "sha256": _file_hash(path),
+        "columns": columns,
+        "rows": n_rows,
+    })
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+def _is_fresh(path, target):
+    # Solo lettura: firma (mtime, dimensione) del CSV uguale a quella dei metadati.
+    # Un mtime diverso con lo stesso contenuto è gestito da build_cache (_touch)
+    meta = _read_meta(target)
+    if meta is None or meta.get("format") != FORMAT_VERSION:
+        return False
+    _, mtime_ns, size = dataset_version(path)
+    return meta["mtime_ns"] == mtime_ns and meta["size"] == size
+
+
+def load_columns(path=DATA_PATH, cache_dir=CACHE_DIR):
+    # Colonne come memmap NumPy in sola lettura (ricostruisce la cache se serve)
+    target = _cache_dir(path, cache_dir)
+    if not _is_fresh(path, target):
+        build_cache(path, cache_dir)
+
+    meta = _read_meta(target)
+    return {
+        c: np.load(os.path.join(target, f"{c}.npy"), mmap_mode="r")
+        for c in meta["columns"]
+    }
+
+
+def load_dataset(path=DATA_PATH, cache_dir=CACHE_DIR):
+    # DataFrame già pulito (outlier BMI rimossi), condiviso da Dashboard e Confronto
+    import pandas as pd
+
+    cols = load_columns(path, cache_dir)
+    return pd.DataFrame({c: np.asarray(a) for c, a in cols.items()})
+
+
+# ------------------- Report tempi di caricamento -------------------
+
+def report(path, cache_dir=CACHE_DIR):
+    import pandas as pd
+
+    t = time.perf_counter()
+    df = pd.read_csv(path)
+    df = clean_chunk(df)
+    csv_s = time.perf_counter() - t
+
+    shutil.rmtree(_cache_dir(path, cache_dir), ignore_errors=True)
+    t = time.perf_counter()
+    load_dataset(path, cache_dir)
+    cold_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    df = load_dataset(path, cache_dir)
+    warm_s = time.perf_counter() - t
+
+    print(f"{path}: {len(df)} righe")
+    print(f"  read_csv + filtro BMI: {csv_s * 1000:9.1f} ms")
+    print(f"  cache fredda (build):  {cold_s * 1000:9.1f} ms")
+    print(f"  cache calda:           {warm_s * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    # python -m utilis.dataset [path] [--rows N]
+    args = sys.argv[1:]
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if "--rows" in args:
+        i = args.index("--rows")
+        n_rows = int(args[i + 1])
+        del args[i:i + 2]
+        from utilis.synthetic import generate
+        path = generate(n_rows, os.path.join(CACHE_DIR, f"synthetic_{n_rows}.csv"))
+    else:
+        path = args[0] if args else DATA_PATH
+
+    report(path)
@@ -0,0 +1,259 @@
+import io
+import os
+import json
+import argparse
+from itertools import islice
+import numpy as np
+import pandas as pd
+
+from utilis.feature_preprocessing import FEATURES, preprocess_batch
+
+RAW_PATH = "data/cardio_train.csv"
+MODEL_DATA_PATH = "data/cardio_clean.csv"  # dataset one-hot per l'addestramento
+CHECKPOINT_PATH = os.path.join("data", ".etl_checkpoint.json")
+
+CHUNK_ROWS = 100_000
+
+# ------------------- Regole di pulizia -------------------
+# Stesse regole di utilis/preprocessing.ipynb, più il filtro BMI della dashboard.
+
+AP_HI_RANGE = (40, 250)
+AP_LO_RANGE = (20, 150)
+HEIGHT_RANGE = (50, 250)
+WEIGHT_RANGE = (20, 300)
+BMI_MIN, BMI_MAX = 10, 60
+
+# (colonne, quantile basso, quantile alto) dei filtri a percentile
+AP_QUANTILES = (["ap_hi", "ap_lo"], 0.025, 0.975)
+HW_QUANTILES = (["height", "weight"], 0.0001, 0.9999)
+
+DB_COLUMNS = ["id", "age", "gender", "height", "weight", "ap_hi", "ap_lo",
+              "cholesterol", "gluc", "smoke", "alco", "active", "cardio", "BMI"]
+MODEL_COLUMNS = ["id"] + FEATURES + ["cardio", "bmi_cat"]
+
+
+def _read_raw(path, chunk_rows=CHUNK_ROWS):
+    return pd.read_csv(path, sep=";", chunksize=chunk_rows)
+
+
+def _read_raw_from(path, offset=0, chunk_rows=CHUNK_ROWS):
+    # Blocchi (DataFrame, offset in byte dopo il blocco) a partire da offset: la ripresa
+    # è un seek, non una rilettura delle righe già elaborate. Una riga finale senza
+    # newline (file ancora in scrittura) resta per la prossima esecuzione.
+    with open(path, "rb") as f:
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            return
+        offset = max(offset, f.tell())
+        f.seek(offset)
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if lines and not lines[-1].endswith(b"\n"):
+                lines.pop()
+            if not lines:
+                return
+            offset += sum(map(len, lines))
+            yield pd.read_csv(io.BytesIO(header + b"".join(lines)), sep=";"), offset
+
+
+def _quantile_from_counts(counts, q):
+    # Quantile con interpolazione lineare (come pandas) da un conteggio per valore
+    values = counts.index.to_numpy(dtype=np.float64)
+    cum = np.cumsum(counts.to_numpy())
+    h = (cum[-1] - 1) * q
+    lo, hi = int(np.floor(h)), int(np.ceil(h))
+    v_lo = values[np.searchsorted(cum, lo, side="right")]
+    v_hi = values[np.searchsorted(cum, hi, side="right")]
+    return float(v_lo + (h - lo) * (v_hi - v_lo))
+
+
+def _add_counts(acc, df, cols):
+    for c in cols:
+        vc = df[c].value_counts()
+        acc[c] = vc if c not in acc else acc[c].add(vc, fill_value=0)
+
+
+def _thresholds(counts, spec):
+    cols, low_q, high_q = spec
+    return {c: [_quantile_from_counts(counts[c].sort_index(), low_q),
+                _quantile_from_counts(counts[c].sort_index(), high_q)] for c in cols}
+
+
+def _between(df, limits):
+    mask = np.ones(len(df), dtype=bool)
+    for c, (lo, hi) in limits.items():
+        mask &= df[c].between(lo, hi).to_numpy()
+    return mask
+
+
+def _ap_mask(df, thresholds):
+    domain = (
+        (df["ap_hi"] > 0) & (df["ap_lo"] > 0) &
+        df["ap_hi"].between(*AP_HI_RANGE) &
+        df["ap_lo"].between(*AP_LO_RANGE)
+    ).to_numpy()
+    return domain & _between(df, thresholds["ap"])
+
+
+def _hw_mask(df, thresholds):
+    domain = (df["height"].between(*HEIGHT_RANGE) & df["weight"].between(*WEIGHT_RANGE)).to_numpy()
+    return domain & _between(df, thresholds["hw"])
+
+
+def compute_thresholds(sources, chunk_rows=CHUNK_ROWS):
+    # Soglie a percentile calcolate in streaming da conteggi per valore:
+    # passata 1 su ap_hi/ap_lo grezzi, passata 2 su altezza/peso delle righe rimaste.
+    counts = {}
+    for path in sources:
+        for chunk in _read_raw(path, chunk_rows=chunk_rows):
+            _add_counts(counts, chunk, AP_QUANTILES[0])
+    thresholds = {"ap": _thresholds(counts, AP_QUANTILES)}
+
+    counts = {}
+    for path in sources:
+        for chunk in _read_raw(path, chunk_rows=chunk_rows):
+            _add_counts(counts, chunk[_ap_mask(chunk, thresholds)], HW_QUANTILES[0])
+    thresholds["hw"] = _thresholds(counts, HW_QUANTILES)
+    return thresholds
+
+
+def clean(raw, thresholds):
+    # Blocco grezzo (età in giorni) -> righe del dataset della dashboard
+    df = raw.copy()
+    df["age"] = (df["age"] / 365).astype(int)
+    df = df[_ap_mask(df, thresholds)]
+    df = df[_hw_mask(df, thresholds)]
+    df["BMI"] = df["weight"] / ((df["height"] / 100) ** 2)
+    df = df[(df["BMI"] > BMI_MIN) & (df["BMI"] < BMI_MAX)]
+    return df[DB_COLUMNS]
+
+
+def bmi_category(bmi):
+    return np.select(
+        [bmi < 18.5, bmi < 25, bmi < 30],
+        ["sottopeso", "normopeso", "sovrappeso"],
+        default="obeso",
+    )
+
+
+def model_ready(df):
+    # Dataset della dashboard -> dataset one-hot per l'addestramento (colonne FEATURES)
+    X = preprocess_batch(df).astype({f: int for f in FEATURES if f not in ("weight", "BMI")})
+    X.insert(0, "id", df["id"].to_numpy())
+    X["cardio"] = df["cardio"].to_numpy()
+    X["bmi_cat"] = bmi_category(df["BMI"].to_numpy())
+    return X[MODEL_COLUMNS]
+
+
+# ------------------- Checkpoint -------------------
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # checkpoint del formato precedente (righe consumate invece di offset): non riutilizzabile
+    return state if "offsets" in state else None
+
+
+def _save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _process(state, source, checkpoint, chunk_rows):
+    # Elabora le righe di source non ancora consumate, salvando il checkpoint a ogni blocco
+    key = os.path.abspath(source)
+    offset = state["offsets"].get(key, 0)
+    if offset > os.path.getsize(source):
+        raise ValueError(f"{source} è più corto dell'ultimo checkpoint: file sostituito?")
+
+    # scarta eventuali scritture parziali successive all'ultimo checkpoint
+    for path, size in state["outputs"].items():
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+    for chunk, offset in _read_raw_from(source, offset, chunk_rows):
+        db = clean(chunk, state["thresholds"])
+        with open(state["db_path"], "a", newline="") as f_db, \
+             open(state["model_path"], "a", newline="") as f_model:
+            db.to_csv(f_db, index=False, header=False)
+            model_ready(db).to_csv(f_model, index=False, header=False)
+            for f in (f_db, f_model):
+                f.flush()
+                os.fsync(f.fileno())
+
+        state["offsets"][key] = offset
+        state["rows_in"] += len(chunk)
+        state["rows_out"] += len(db)
+        state["outputs"] = {p: os.path.getsize(p) for p in state["outputs"]}
+        _save_checkpoint(checkpoint, state)
+    return state
+
+
+def run(db_path, source=RAW_PATH, model_path=MODEL_DATA_PATH,
+        checkpoint=CHECKPOINT_PATH, chunk_rows=CHUNK_ROWS, resume=True):
+    # Elaborazione completa; se esiste un checkpoint compatibile riprende da dove si era fermata.
+    # db_path (dataset della dashboard, età in anni + BMI) è sempre esplicito: data/cardio_db.csv
+    # è versionato e va sovrascritto solo su richiesta
+    state = _load_checkpoint(checkpoint) if resume else None
+    if state is None or state["db_path"] != db_path or state["model_path"] != model_path:
+        state = {
+            "thresholds": compute_thresholds([source], chunk_rows),
+            "db_path": db_path,
+            "model_path": model_path,
+            "offsets": {},
+            "rows_in": 0,
+            "rows_out": 0,
+        }
+        for path, columns in ((db_path, DB_COLUMNS), (model_path, MODEL_COLUMNS)):
+            with open(path, "w", newline="") as f:
+                f.write(",".join(columns) + "\n")
+        state["outputs"] = {p: os.path.getsize(p) for p in (db_path, model_path)}
+        _save_checkpoint(checkpoint, state)
+
+    return _process(state, source, checkpoint, chunk_rows)
+
+
+def append(source, checkpoint=CHECKPOINT_PATH, chunk_rows=CHUNK_ROWS):
+    # Aggiunge nuove righe grezze (file nuovo o righe in coda a un file già visto)
+    # con le soglie congelate dell'elaborazione iniziale, senza rielaborare lo storico.
+    state = _load_checkpoint(checkpoint)
+    if state is None:
+        raise FileNotFoundError(f"Nessun checkpoint in {checkpoint}: eseguire prima 'run'")
+    return _process(state, source, checkpoint, chunk_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETL a blocchi da cardio_train.csv ai dataset puliti")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="elaborazione completa (riprende da checkpoint se presente)")
+    p_run.add_argument("--source", default=RAW_PATH)
+    p_run.add_argument("--db", required=True, help="dataset della dashboard da scrivere (data/cardio_db.csv è versionato)")
+    p_run.add_argument("--model-data", default=MODEL_DATA_PATH)
+    p_run.add_argument("--restart", action="store_true", help="ignora il checkpoint esistente")
+
+    p_append = sub.add_parser("append", help="aggiunge righe grezze nuove")
+    p_append.add_argument("--source", required=True)
+
+    for p in (p_run, p_append):
+        p.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+        p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        state = run(args.db, args.source, args.model_data, args.checkpoint,
+                    args.chunk_rows, resume=not args.restart)
+    else:
+        state = append(args.source, args.checkpoint, args.chunk_rows)
+    print(f"righe lette: {state['rows_in']}, righe scritte: {state['rows_out']}")
+
+
+if __name__ == "__main__":
+    main()
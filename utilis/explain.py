@@ -0,0 +1,61 @@
+import numpy as np
+
+from utilis.feature_preprocessing import FEATURES
+
+# Spiegazioni per la regressione logistica: il logit è lineare nelle feature, quindi
+# il contributo di ogni feature è w_j·(x_j - mu_j)/s_j == coef_j·(x_j - mu_j) rispetto
+# al paziente medio (media dello scaler). base + Σ contributi == logit, esattamente.
+
+# Feature del modello raggruppate per campo grezzo (dummy sommate al campo d'origine)
+FEATURE_GROUPS = {
+    "age": ["age"],
+    "height": ["height"],
+    "weight": ["weight"],
+    "ap_hi": ["ap_hi"],
+    "ap_lo": ["ap_lo"],
+    "smoke": ["smoke"],
+    "alco": ["alco"],
+    "active": ["active"],
+    "gender": ["gender_2"],
+    "cholesterol": ["cholesterol_2", "cholesterol_3"],
+    "gluc": ["gluc_2", "gluc_3"],
+    "BMI": ["BMI", "bmi_obeso", "bmi_sottopeso", "bmi_sovrappeso"],
+}
+
+
+def base_value(engine):
+    # Logit del paziente di riferimento (tutte le feature alla media)
+    return engine.intercept + float(engine.coef @ engine.mean)
+
+
+def contributions(engine, X):
+    # Contributi al logit (con segno): una riga (1-D) o un batch (n × FEATURES) in
+    # un'unica operazione vettoriale, stesso formato di preprocess_batch(as_array=True)
+    X = np.asarray(X, dtype=np.float64)
+    return (X - engine.mean) * engine.coef
+
+
+def group_contributions(contrib, features=FEATURES, groups=FEATURE_GROUPS):
+    # Somma dei contributi per campo grezzo: matrice (n × gruppi) o vettore per una riga
+    idx = {f: i for i, f in enumerate(features)}
+    G = np.zeros((len(features), len(groups)))
+    for j, members in enumerate(groups.values()):
+        for f in members:
+            G[idx[f], j] = 1.0
+    return np.asarray(contrib) @ G
+
+
+def contribution_frame(engine, X, grouped=False, index=None):
+    # DataFrame dei contributi per report di coorte (una colonna per feature o per
+    # campo), con base e logit per controllo
+    import pandas as pd
+
+    contrib = contributions(engine, np.atleast_2d(X))
+    columns = list(engine.features)
+    if grouped:
+        contrib = group_contributions(contrib, columns)
+        columns = list(FEATURE_GROUPS)
+    frame = pd.DataFrame(contrib, columns=columns, index=index)
+    frame["base"] = base_value(engine)
+    frame["logit"] = frame["base"] + contrib.sum(axis=1)
+    return frame
@@ -1,6 +1,8 @@
-import pandas as pd
 import numpy as np
 
+# pandas importato solo quando serve un DataFrame: la pagina Predizione
+# e il server lavorano su array e non pagano il suo import
+
 FEATURES = [
     'age', 'height', 'weight', 'ap_hi', 'ap_lo',
     'smoke', 'alco', 'active',
@@ -47,5 +49,55 @@ def preprocess_input(age, height, weight, ap_hi, ap_lo,
     row["bmi_sottopeso"] = 1 if BMI < 18.5 else 0
 
     # Convertire in DF con colonne in ordine corretto
+    import pandas as pd
     df = pd.DataFrame([row])
     return df[FEATURES]
+
+
+# Campi grezzi attesi in input (stesso ordine di preprocess_input)
+RAW_FIELDS = [
+    'age', 'height', 'weight', 'ap_hi', 'ap_lo',
+    'gender', 'cholesterol', 'gluc', 'smoke', 'alco', 'active'
+]
+
+def preprocess_batch(data=None, as_array=False, **fields):
+    # Versione vettorizzata di preprocess_input: accetta un DataFrame con le
+    # colonne RAW_FIELDS oppure gli stessi campi come array NumPy (keyword).
+    # Restituisce la matrice FEATURES in un solo passaggio, senza cicli Python.
+    if data is not None:
+        fields = {c: data[c] for c in RAW_FIELDS}
+
+    missing = [c for c in RAW_FIELDS if c not in fields]
+    if missing:
+        raise ValueError(f"Campi mancanti: {missing}")
+
+    cols = {c: np.asarray(fields[c], dtype=np.float64).ravel() for c in RAW_FIELDS}
+    n = len(cols["age"])
+
+    # Matrice contigua nell'ordine di FEATURES
+    X = np.empty((n, len(FEATURES)), dtype=np.float64)
+    idx = {f: i for i, f in enumerate(FEATURES)}
+
+    for c in ['age', 'height', 'weight', 'ap_hi', 'ap_lo', 'smoke', 'alco', 'active']:
+        X[:, idx[c]] = cols[c]
+
+    # Dummy: gender, cholesterol, gluc
+    X[:, idx["gender_2"]] = cols["gender"] == 2
+    X[:, idx["cholesterol_2"]] = cols["cholesterol"] == 2
+    X[:, idx["cholesterol_3"]] = cols["cholesterol"] == 3
+    X[:, idx["gluc_2"]] = cols["gluc"] == 2
+    X[:, idx["gluc_3"]] = cols["gluc"] == 3
+
+    # BMI e relative categorie
+    BMI = cols["weight"] / ((cols["height"] / 100) ** 2)
+    X[:, idx["BMI"]] = BMI
+    X[:, idx["bmi_obeso"]] = BMI >= 30
+    X[:, idx["bmi_sovrappeso"]] = (BMI >= 25) & (BMI < 30)
+    X[:, idx["bmi_sottopeso"]] = BMI < 18.5
+
+    if as_array:
+        return X
+
+    import pandas as pd
+    index = data.index if isinstance(data, pd.DataFrame) else None
+    return pd.DataFrame(X, columns=FEATURES, index=index)
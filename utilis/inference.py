@@ -0,0 +1,72 @@
+import os
+import pickle
+import numpy as np
+
+from utilis.feature_preprocessing import FEATURES
+
+MODEL_PATH = "model/model.pkl"
+SCALER_PATH = "model/scaler.pkl"
+
+
+class FusedLogit:
+    # Scaler + regressione logistica fusi in un unico prodotto scalare:
+    # w·((x - mu)/s) + b  ==  (w/s)·x + (b - Σ w·mu/s)
+    # I coefficienti vengono piegati una sola volta al caricamento; mean (media
+    # dello scaler) resta come punto di riferimento per le spiegazioni (utilis.explain).
+
+    def __init__(self, coef, intercept, classes=(0, 1), features=FEATURES, mean=None):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.classes = np.asarray(classes)
+        self.features = list(features)
+        self.mean = np.zeros_like(self.coef) if mean is None else np.asarray(mean, dtype=np.float64).ravel()
+
+        if len(self.coef) != len(self.features):
+            raise ValueError(
+                f"Il modello ha {len(self.coef)} coefficienti, attese {len(self.features)} feature"
+            )
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        w = np.asarray(model.coef_, dtype=np.float64).ravel()
+        b = float(np.asarray(model.intercept_).ravel()[0])
+
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        mean = np.zeros_like(w) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones_like(w) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        coef = w / scale
+        intercept = b - np.dot(coef, mean)
+
+        features = getattr(scaler, "feature_names_in_", FEATURES)
+        return cls(coef, intercept, classes=model.classes_, features=features, mean=mean)
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return X @ self.coef + self.intercept
+
+    def predict(self, X):
+        # Probabilità della classe 1 e classe predetta da un solo logit.
+        # Accetta una riga (1-D) o un batch (2-D), come preprocess_batch.
+        z = self.decision_function(X)
+        proba = 1.0 / (1.0 + np.exp(-z))
+        pred = self.classes[(z > 0).astype(int)]
+        return proba, pred
+
+
+def model_version(*paths):
+    # Firma economica (solo stat) degli artefatti: cambia quando vengono riscritti
+    paths = paths or (MODEL_PATH, SCALER_PATH)
+    return tuple(
+        (os.path.abspath(p), os.stat(p).st_mtime_ns, os.stat(p).st_size)
+        for p in paths
+    )
+
+
+def load_engine(model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    with open(scaler_path, "rb") as f:
+        scaler = pickle.load(f)
+    return FusedLogit.from_sklearn(model, scaler)
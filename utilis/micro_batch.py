@@ -0,0 +1,145 @@
+import time
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+import numpy as np
+
+WINDOW_MS = 2.0    # attesa massima dal primo elemento del batch
+MAX_ROWS = 256     # flush anticipato a N righe
+METRICS_WINDOW = 1000
+
+_STOP = object()
+
+
+class MicroBatcher:
+    # Scheduler condiviso dal processo: raccoglie le richieste di scoring che
+    # arrivano da sessioni diverse entro una finestra (window_ms o max_rows) e le
+    # valuta con un solo engine.predict vettorizzato (scaling + logit fusi).
+    # Il preprocess resta al chiamante; ogni chiamante riceve il proprio Future.
+
+    def __init__(self, engine, window_ms=WINDOW_MS, max_rows=MAX_ROWS):
+        self.engine = engine
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=METRICS_WINDOW)
+        self._queue_waits = deque(maxlen=METRICS_WINDOW)
+        self._flush_reasons = Counter()
+        self._batches = 0
+        self._rows = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        # row: vettore delle feature già preprocessate (una riga di preprocess_batch)
+        future = Future()
+        with self._lock:
+            if not self._closed:
+                self._queue.put((row, future, time.perf_counter()))
+                return future
+
+        # Dopo close() (es. batcher rilasciato dalla cache mentre una sessione lo usa
+        # ancora): nessun worker, la richiesta è valutata nel thread chiamante
+        try:
+            proba, pred = self._predict([row])
+            future.set_result((float(proba[0]), int(pred[0])))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def score(self, row, timeout=None):
+        # (probabilità, classe) per una singola richiesta
+        return self.submit(row).result(timeout)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout=1)
+
+        # Richieste rimaste in coda (worker non terminato entro il timeout): falliscono
+        # invece di lasciare il chiamante in attesa
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(RuntimeError("MicroBatcher chiuso"))
+
+    # ---- Worker
+    def _predict(self, rows):
+        return self.engine.predict(np.vstack(rows).astype(np.float64, copy=False))
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None, None
+        items = [first]
+        deadline = first[2] + self.window
+        reason = "window"
+
+        while len(items) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                reason = "close"
+                break
+            items.append(item)
+        else:
+            reason = "size"
+        return items, reason
+
+    def _run(self):
+        while True:
+            items, reason = self._collect()
+            if items is None:
+                return
+
+            flushed = time.perf_counter()
+            try:
+                proba, pred = self._predict([row for row, _, _ in items])
+                for i, (_, future, _) in enumerate(items):
+                    future.set_result((float(proba[i]), int(pred[i])))
+            except Exception as e:
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._lock:
+                self._batches += 1
+                self._rows += len(items)
+                self._batch_sizes.append(len(items))
+                self._queue_waits.extend(flushed - t for _, _, t in items)
+                self._flush_reasons[reason] += 1
+
+    # ---- Metriche
+    def metrics(self):
+        with self._lock:
+            sizes = np.fromiter(self._batch_sizes, dtype=np.float64)
+            waits = np.fromiter(self._queue_waits, dtype=np.float64) * 1000
+            out = {
+                "batches": self._batches,
+                "rows": self._rows,
+                "queue_depth": self._queue.qsize(),
+                "flush_reasons": dict(self._flush_reasons),
+            }
+        if len(sizes):
+            out["batch_size_mean"] = float(sizes.mean())
+            out["batch_size_max"] = int(sizes.max())
+            out["queue_wait_p50_ms"] = float(np.percentile(waits, 50))
+            out["queue_wait_p95_ms"] = float(np.percentile(waits, 95))
+        return out
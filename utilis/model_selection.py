@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from utilis.feature_preprocessing import FEATURES
+from utilis.etl import MODEL_DATA_PATH
+from utilis.dataset import CACHE_DIR
+
+TARGET = "cardio"
+N_FOLDS = 5
+SEED = 42
+LATENCY_ROWS = 50
+
+# Modelli candidati (come nel notebook) e griglie di iperparametri
+CANDIDATES = {
+    "logreg": {"C": [0.01, 0.1, 1.0, 10.0]},
+    "random_forest": {"n_estimators": [200, 500], "max_depth": [None, 10]},
+    "rf_top10": {"n_estimators": [200], "max_depth": [10]},
+}
+
+
+def build_model(name, params):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.feature_selection import SelectFromModel
+    from sklearn.pipeline import make_pipeline
+
+    if name == "logreg":
+        return LogisticRegression(max_iter=1000, random_state=SEED, **params)
+    if name == "random_forest":
+        return RandomForestClassifier(random_state=SEED, n_jobs=1, **params)
+    if name == "rf_top10":
+        # prime 10 feature per importanza (MDI), calcolate sul fold di training
+        selector = SelectFromModel(
+            RandomForestClassifier(n_estimators=100, random_state=SEED, n_jobs=1),
+            max_features=10, threshold=-np.inf,
+        )
+        return make_pipeline(selector, RandomForestClassifier(random_state=SEED, n_jobs=1, **params))
+    raise ValueError(f"Modello sconosciuto: {name}")
+
+
+def _grid(params):
+    keys = sorted(params)
+    for values in itertools.product(*(params[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def data_hash(X, y):
+    h = hashlib.sha256()
+    h.update(json.dumps(FEATURES).encode())
+    h.update(np.ascontiguousarray(X).tobytes())
+    h.update(np.ascontiguousarray(y).tobytes())
+    return h.hexdigest()[:16]
+
+
+def prepare_folds(X, y, root, n_folds=N_FOLDS):
+    # Matrici dei fold già scalate (scaler fittato sul solo training), salvate una
+    # volta su disco e lette dai worker come memmap in sola lettura
+    folds_dir = os.path.join(root, f"folds_{n_folds}")
+    done = os.path.join(folds_dir, "done")
+    if os.path.exists(done):
+        return folds_dir
+
+    os.makedirs(folds_dir, exist_ok=True)
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=SEED)
+    for i, (train, test) in enumerate(skf.split(X, y)):
+        scaler = StandardScaler().fit(X[train])
+        np.save(os.path.join(folds_dir, f"{i}_X_train.npy"), scaler.transform(X[train]))
+        np.save(os.path.join(folds_dir, f"{i}_X_test.npy"), scaler.transform(X[test]))
+        np.save(os.path.join(folds_dir, f"{i}_y_train.npy"), y[train])
+        np.save(os.path.join(folds_dir, f"{i}_y_test.npy"), y[test])
+    open(done, "w").close()
+    return folds_dir
+
+
+def _task_key(dhash, name, params, fold, n_folds):
+    payload = json.dumps([dhash, name, params, fold, n_folds, SEED, sklearn.__version__], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _load_result(path):
+    # Risultato in cache; file assente o illeggibile (es. troncato) -> da ricalcolare
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_result(path, result):
+    # Scrittura atomica come utilis.etl._save_checkpoint: mai un .json troncato
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(result, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def run_fold(folds_dir, name, params, fold):
+    # Eseguito in un processo del pool: legge il fold come memmap, fitta e misura
+    load = lambda part: np.load(os.path.join(folds_dir, f"{fold}_{part}.npy"), mmap_mode="r")
+    X_train, X_test, y_train, y_test = load("X_train"), load("X_test"), load("y_train"), load("y_test")
+
+    model = build_model(name, params)
+    t = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    proba = model.predict_proba(X_test)[:, 1]
+    batch_us = (time.perf_counter() - t) / len(y_test) * 1e6
+
+    row = np.asarray(X_test[:1])
+    samples = []
+    for _ in range(LATENCY_ROWS):
+        t = time.perf_counter()
+        model.predict_proba(row)
+        samples.append(time.perf_counter() - t)
+
+    return {
+        "model": name,
+        "params": params,
+        "fold": fold,
+        "accuracy": float(accuracy_score(y_test, proba > 0.5)),
+        "roc_auc": float(roc_auc_score(y_test, proba)),
+        "fit_s": fit_s,
+        "batch_us_per_row": batch_us,
+        "single_row_ms": float(np.median(samples) * 1000),
+    }
+
+
+def run(path=MODEL_DATA_PATH, candidates=CANDIDATES, n_folds=N_FOLDS, workers=None,
+        cache_dir=os.path.join(CACHE_DIR, "model_selection")):
+    df = pd.read_csv(path)
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    y = df[TARGET].to_numpy()
+
+    dhash = data_hash(X, y)
+    root = os.path.join(cache_dir, dhash)
+    results_dir = os.path.join(root, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    folds_dir = prepare_folds(X, y, root, n_folds)
+    del X, y, df
+
+    # Risultati già calcolati (stessi dati + parametri) letti dalla cache su disco
+    results, todo = [], []
+    for name, grid in candidates.items():
+        for params in _grid(grid):
+            for fold in range(n_folds):
+                cached = os.path.join(results_dir, _task_key(dhash, name, params, fold, n_folds) + ".json")
+                res = _load_result(cached)
+                if res is not None:
+                    results.append(res)
+                else:
+                    todo.append((cached, name, params, fold))
+
+    print(f"{len(results)} fold dalla cache, {len(todo)} da calcolare")
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(run_fold, folds_dir, name, params, fold): cached
+                   for cached, name, params, fold in todo}
+        for future in as_completed(futures):
+            res = future.result()
+            _save_result(futures[future], res)
+            results.append(res)
+
+    return leaderboard(results)
+
+
+def leaderboard(results):
+    df = pd.DataFrame(results)
+    df["params"] = df["params"].apply(lambda p: json.dumps(p, sort_keys=True))
+    board = df.groupby(["model", "params"]).agg(
+        folds=("fold", "count"),
+        accuracy=("accuracy", "mean"),
+        roc_auc=("roc_auc", "mean"),
+        roc_auc_std=("roc_auc", "std"),
+        fit_s=("fit_s", "mean"),
+        batch_us_per_row=("batch_us_per_row", "mean"),
+        single_row_ms=("single_row_ms", "median"),
+    ).reset_index()
+    return board.sort_values("roc_auc", ascending=False).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confronto modelli e ricerca iperparametri con k-fold in parallelo")
+    parser.add_argument("--data", default=MODEL_DATA_PATH)
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--models", default=",".join(CANDIDATES), help="sottoinsieme di " + ",".join(CANDIDATES))
+    parser.add_argument("--output", default=None, help="salva la classifica in CSV")
+    args = parser.parse_args()
+
+    candidates = {m: CANDIDATES[m] for m in args.models.split(",")}
+    board = run(args.data, candidates, args.folds, args.workers)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(board.round(4).to_string())
+    if args.output:
+        board.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
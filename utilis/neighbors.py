@@ -0,0 +1,94 @@
+import numpy as np
+
+# Coorte dei "pazienti simili": ricerca esatta dei k vicini (distanza euclidea sulle
+# feature standardizzate) a blocchi con NumPy, senza strutture ad albero.
+#
+# Le righe sono raggruppate per profilo categorico (genere, colesterolo, glucosio,
+# fumo, alcol, attività): dentro un gruppo la parte categorica della distanza è una
+# costante, quindi si scandiscono solo le feature continue e i gruppi vengono visitati
+# in ordine di distanza categorica, fermandosi quando questa supera il k-esimo migliore.
+CATEGORICAL_COLUMNS = ["gender", "cholesterol", "gluc", "smoke", "alco", "active"]
+CONTINUOUS_COLUMNS = ["age", "height", "weight", "BMI", "ap_hi", "ap_lo"]
+NEIGHBOR_COLUMNS = CONTINUOUS_COLUMNS + CATEGORICAL_COLUMNS
+K = 100
+BLOCK_ROWS = 1 << 20
+
+
+class CohortIndex:
+    # Costruito una volta per versione del dataset e condiviso tra sessioni
+
+    def __init__(self, data, block_rows=BLOCK_ROWS):
+        self.columns = NEIGHBOR_COLUMNS
+        self.block_rows = block_rows
+        self.data = {c: np.asarray(data[c]) for c in self.columns}
+        self.cardio = np.asarray(data["cardio"])
+        self.n = len(self.cardio)
+        self.cardio_rate = float(self.cardio.mean()) if self.n else np.nan
+
+        self.mean = {c: self.data[c].mean(dtype=np.float64) for c in self.columns}
+        self.scale = {c: self.data[c].std(dtype=np.float64) or 1.0 for c in self.columns}
+
+        # Gruppi per profilo categorico: righe riordinate per gruppo (ordine stabile)
+        codes = [np.unique(self.data[c], return_inverse=True) for c in CATEGORICAL_COLUMNS]
+        key = np.ravel_multi_index([inv for _, inv in codes], [len(u) for u, _ in codes])
+        self.order = np.argsort(key, kind="stable")
+        groups, self.group_start, counts = np.unique(key[self.order], return_index=True, return_counts=True)
+        self.group_stop = self.group_start + counts
+        levels = np.unravel_index(groups, [len(u) for u, _ in codes])
+        self.group_cat = np.column_stack([
+            (u[lv] - self.mean[c]) / self.scale[c]
+            for c, (u, _), lv in zip(CATEGORICAL_COLUMNS, codes, levels)
+        ])
+
+        # Feature continue standardizzate, float32 per colonna (scansione contigua)
+        self.XT = np.empty((len(CONTINUOUS_COLUMNS), self.n), dtype=np.float32)
+        for j, c in enumerate(CONTINUOUS_COLUMNS):
+            self.XT[j] = (self.data[c][self.order] - self.mean[c]) / self.scale[c]
+        self.sq = np.einsum("ij,ij->j", self.XT, self.XT)
+
+    def _standardize(self, values, columns):
+        return np.array([(float(values[c]) - self.mean[c]) / self.scale[c] for c in columns])
+
+    def query(self, values, k=K):
+        # (indici delle righe, distanze) dei k pazienti più vicini, in ordine di distanza
+        k = min(k, self.n)
+        q = self._standardize(values, CONTINUOUS_COLUMNS)
+        q32 = q.astype(np.float32)
+        q_sq = float(q @ q)
+        g2 = ((self.group_cat - self._standardize(values, CATEGORICAL_COLUMNS)) ** 2).sum(axis=1)
+
+        best = np.empty(0, dtype=np.int64)
+        best_d2 = np.empty(0)
+        tau = np.inf
+        for g in np.argsort(g2, kind="stable"):
+            if g2[g] > tau:
+                break  # gruppi restanti tutti più lontani del k-esimo
+            for start in range(self.group_start[g], self.group_stop[g], self.block_rows):
+                stop = min(start + self.block_rows, self.group_stop[g])
+                d2 = self.sq[start:stop] - 2 * (q32 @ self.XT[:, start:stop]) + (q_sq + g2[g])
+                # tolleranza sul float32: i casi al limite vengono decisi in float64 più sotto
+                cand = np.flatnonzero(d2 <= tau + 1e-4 * (1 + tau))
+                best = np.concatenate([best, cand + start])
+                best_d2 = np.concatenate([best_d2, d2[cand]])
+                if len(best) > 2 * k:
+                    keep = np.argpartition(best_d2, k - 1)[:k]
+                    best, best_d2 = best[keep], best_d2[keep]
+                if len(best) >= k:
+                    tau = float(np.partition(best_d2, k - 1)[k - 1])
+
+        # Distanze esatte (float64) sui candidati; a parità vince l'indice minore
+        d2 = ((self.XT[:, best].T.astype(np.float64) - q) ** 2).sum(axis=1)
+        d2 += g2[np.searchsorted(self.group_start, best, side="right") - 1]
+        ids = self.order[best]
+        order = np.lexsort((ids, d2))[:k]
+        return ids[order], np.sqrt(d2[order])
+
+    def cohort(self, values, k=K):
+        # Riepilogo della coorte: tasso di cardio osservato e medie delle feature
+        ids, distances = self.query(values, k)
+        return {
+            "ids": ids,
+            "distances": distances,
+            "cardio_rate": float(self.cardio[ids].mean()),
+            "means": {c: float(self.data[c][ids].mean()) for c in self.columns},
+        }
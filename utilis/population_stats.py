@@ -0,0 +1,48 @@
+import numpy as np
+
+# Colonne numeriche indicizzate per i confronti con la popolazione
+NUMERIC_COLUMNS = ["age", "height", "weight", "BMI", "ap_hi", "ap_lo", "cholesterol", "gluc"]
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+NBINS = 30
+
+
+class PopulationIndex:
+    # Indice costruito una volta per versione del dataset e condiviso tra sessioni:
+    # array ordinati per colonna (percentili in O(log n) con searchsorted),
+    # medie, quantili e conteggi degli istogrammi già calcolati.
+
+    def __init__(self, data, columns=NUMERIC_COLUMNS, nbins=NBINS):
+        self.columns = [c for c in columns if c in data]
+        self.n = len(data[self.columns[0]]) if self.columns else 0
+
+        self.sorted = {}
+        self.means = {}
+        self.quantiles = {}
+        self.histograms = {}
+
+        for c in self.columns:
+            values = np.sort(np.asarray(data[c], dtype=np.float64))
+            self.sorted[c] = values
+            self.means[c] = float(values.mean())
+            self.quantiles[c] = dict(zip(QUANTILES, np.quantile(values, QUANTILES)))
+            self.histograms[c] = np.histogram(values, bins=nbins)
+
+    def percentile(self, column, value):
+        # % della popolazione con valore strettamente minore (come (df[c] < v).mean())
+        idx = np.searchsorted(self.sorted[column], value, side="left")
+        return idx / self.n * 100
+
+    def percentiles(self, values):
+        # Percentile del paziente per ogni feature indicizzata presente in values
+        return {
+            c: self.percentile(c, values[c])
+            for c in self.columns if values.get(c) is not None
+        }
+
+    def mean(self, column):
+        return self.means[column]
+
+    def histogram(self, column):
+        # (conteggi, bordi dei bin)
+        return self.histograms[column]
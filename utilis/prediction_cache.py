@@ -0,0 +1,79 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Dimensione massima configurabile da variabile d'ambiente
+MAXSIZE = int(os.environ.get("CARDIO_PREDICTION_CACHE_SIZE", "4096"))
+
+
+class PredictionCache:
+    # Cache LRU thread-safe, condivisa dal processo, davanti a scale/predict.
+    # La chiave è la tupla degli 11 campi di input (tutti interi o piccoli enum);
+    # la cache si svuota quando cambia la versione del modello (model.pkl / scaler.pkl).
+
+    def __init__(self, maxsize=MAXSIZE):
+        if maxsize <= 0:
+            raise ValueError("maxsize deve essere positivo")
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.version = version
+
+    def get(self, key, version=None):
+        with self._lock:
+            self._check_version(version)
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        with self._lock:
+            # un risultato calcolato con un modello ormai sostituito non va salvato
+            if version != self.version:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, version=None):
+        # (valore, hit): il calcolo avviene fuori dal lock
+        value = self.get(key, version)
+        if value is not None:
+            return value, True
+        value = compute()
+        self.put(key, value, version)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,197 @@
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+
+from utilis.feature_preprocessing import RAW_FIELDS
+
+# Storico delle predizioni su SQLite (WAL). Chi predice accoda soltanto
+# (put_nowait, mai bloccante: a coda piena il record viene scartato e contato);
+# un thread scrittore raccoglie la coda in transazioni da più righe.
+DB_PATH = os.environ.get("CARDIO_PREDICTION_DB", os.path.join("data", "predictions.db"))
+QUEUE_SIZE = 10_000   # elementi in attesa (un elemento = una richiesta, anche batch)
+BATCH_ROWS = 500      # righe massime per transazione
+FLUSH_MS = 200        # attesa massima prima di scrivere un batch incompleto
+
+COLUMNS = (["ts", "session_id", "source"] + RAW_FIELDS
+           + ["proba", "pred", "model_version", "latency_ms", "cache_hit"])
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    session_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    {", ".join(f"{c} REAL NOT NULL" for c in RAW_FIELDS)},
+    proba REAL NOT NULL,
+    pred INTEGER NOT NULL,
+    model_version TEXT,
+    latency_ms REAL,
+    cache_hit INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_session_ts ON predictions (session_id, ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+"""
+
+INSERT = f"INSERT INTO predictions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+logger = logging.getLogger("cardio.prediction_store")
+
+_STOP = object()
+
+
+def version_label(version):
+    # Firma di serving_version() -> testo leggibile (file@mtime_ns)
+    return ";".join(f"{os.path.basename(path)}@{mtime_ns}" for path, mtime_ns, _ in version)
+
+
+class _Batch:
+    # Richiesta batch accodata così com'è: le righe vengono costruite dallo scrittore
+    def __init__(self, meta, columns, proba, pred):
+        self.meta, self.columns, self.proba, self.pred = meta, columns, proba, pred
+
+    def __len__(self):
+        return len(self.proba)
+
+    def rows(self):
+        ts, session_id, source, model_version, latency_ms = self.meta
+        fields = zip(*(self.columns[f] for f in RAW_FIELDS))
+        for values, p, c in zip(fields, self.proba, self.pred):
+            yield (ts, session_id, source, *map(float, values), float(p), int(c),
+                   model_version, latency_ms, 0)
+
+
+class PredictionStore:
+
+    def __init__(self, path=DB_PATH, batch_rows=BATCH_ROWS, flush_ms=FLUSH_MS, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.flush_s = flush_ms / 1000
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self._lock = threading.Lock()  # contatori aggiornati da sessioni e scrittore
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._run, name="prediction-store", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # in WAL: durabile a ogni checkpoint, niente fsync per commit
+        return conn
+
+    # ------------------- Scrittura (mai bloccante) -------------------
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(item)
+            return False
+
+    def record(self, session_id, fields, proba, pred, model_version=None, latency_ms=None,
+               cache_hit=False, source="app"):
+        # fields: tupla nell'ordine di RAW_FIELDS oppure dizionario
+        values = [fields[f] for f in RAW_FIELDS] if isinstance(fields, dict) else list(fields)
+        row = (time.time(), session_id, source, *map(float, values), float(proba), int(pred),
+               model_version, latency_ms, int(cache_hit))
+        return self._put([row])
+
+    def record_many(self, session_id, columns, proba, pred, model_version=None, latency_ms=None,
+                    source="api"):
+        # Un batch (colonne RAW_FIELDS + array di risultati) occupa un solo posto in coda
+        meta = (time.time(), session_id, source, model_version, latency_ms)
+        return self._put(_Batch(meta, columns, proba, pred))
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                items = [self._queue.get()]
+                n = 0 if items[0] is _STOP else len(items[0])
+                deadline = time.monotonic() + self.flush_s
+                while items[-1] is not _STOP and n < self.batch_rows:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                    n += 0 if items[-1] is _STOP else len(items[-1])
+
+                rows = [row for item in items if item is not _STOP
+                        for row in (item.rows() if isinstance(item, _Batch) else item)]
+                if rows:
+                    try:
+                        with conn:
+                            conn.executemany(INSERT, rows)
+                        with self._lock:
+                            self.written += len(rows)
+                            self.batches += 1
+                    except sqlite3.Error:
+                        with self._lock:
+                            self.errors += len(rows)
+                        logger.exception("Scrittura di %d predizioni fallita", len(rows))
+
+                for _ in items:
+                    self._queue.task_done()
+                if items[-1] is _STOP:
+                    return
+        finally:
+            conn.close()
+
+    def flush(self):
+        # Attende che la coda sia scritta (benchmark e chiusura, non nel percorso di scoring)
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def stats(self):
+        with self._lock:
+            return {"written": self.written, "batches": self.batches, "dropped": self.dropped,
+                    "errors": self.errors, "queued": self._queue.qsize()}
+
+    # ------------------- Letture (indicizzate) -------------------
+
+    def _query(self, sql, params=()):
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(r) for r in conn.execute(sql, params)]
+
+    def history(self, session_id, limit=50):
+        # Ultime predizioni di una sessione (indice session_id, ts)
+        return self._query(
+            "SELECT * FROM predictions WHERE session_id = ? ORDER BY ts DESC LIMIT ?",
+            (session_id, limit),
+        )
+
+    def summary(self, since=None):
+        # Aggregati per giorno dall'istante since (indice ts)
+        return self._query(
+            """SELECT date(ts, 'unixepoch', 'localtime') AS giorno,
+                      COUNT(*) AS predizioni,
+                      COUNT(DISTINCT session_id) AS sessioni,
+                      AVG(proba) AS rischio_medio,
+                      AVG(pred) AS quota_alto_rischio,
+                      AVG(latency_ms) AS latenza_media_ms,
+                      MAX(latency_ms) AS latenza_max_ms
+               FROM predictions WHERE ts >= ?
+               GROUP BY giorno ORDER BY giorno""",
+            (since or 0,),
+        )
@@ -0,0 +1,309 @@
+import json
+import math
+import time
+import logging
+import argparse
+import selectors
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from utilis.feature_preprocessing import RAW_FIELDS, preprocess_batch
+from utilis.inference import MODEL_PATH, SCALER_PATH
+from utilis.artifact import ARTIFACT_PATH, load_serving_engine
+from utilis.prediction_store import PredictionStore, version_label
+from utilis.etl import AP_HI_RANGE, AP_LO_RANGE, HEIGHT_RANGE, WEIGHT_RANGE
+
+MAX_BODY_BYTES = 1 << 20      # 1 MB per richiesta
+MAX_BATCH_ROWS = 10_000
+KEEP_ALIVE_TIMEOUT = 30       # secondi di inattività prima di chiudere la connessione
+REQUEST_TIMEOUT = 10          # secondi per leggere una richiesta già iniziata
+IDLE_CHECK_S = 1.0            # granularità del controllo delle connessioni inattive
+
+# Valori ammessi per campo: intervalli plausibili (stessi limiti della pulizia in utilis.etl)
+# o codici delle variabili categoriche; fuori da qui il modello non ha senso o va in errore
+FIELD_RANGES = {"age": (1, 120), "height": HEIGHT_RANGE, "weight": WEIGHT_RANGE,
+                "ap_hi": AP_HI_RANGE, "ap_lo": AP_LO_RANGE}
+FIELD_CODES = {"gender": (1, 2), "cholesterol": (1, 2, 3), "gluc": (1, 2, 3),
+               "smoke": (0, 1), "alco": (0, 1), "active": (0, 1)}
+
+logger = logging.getLogger("cardio.scoring")
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _columns(rows):
+    # Lista di record JSON -> colonne per preprocess_batch
+    if not isinstance(rows, list) or not rows:
+        raise RequestError(400, "Attesa una lista non vuota di pazienti")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise RequestError(413, f"Massimo {MAX_BATCH_ROWS} righe per batch")
+
+    columns = {f: [] for f in RAW_FIELDS}
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise RequestError(400, f"Riga {i}: atteso un oggetto JSON")
+        for f in RAW_FIELDS:
+            columns[f].append(_value(row, f, i))
+    return columns
+
+
+def _value(row, field, i):
+    # Numero finito (niente stringhe né booleani) nell'intervallo o tra i codici del campo
+    if field not in row:
+        raise RequestError(400, f"Riga {i}: campo mancante: {field}")
+    value = row[field]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RequestError(400, f"Riga {i}: il campo {field} deve essere numerico")
+    try:
+        value = float(value)
+    except OverflowError:
+        value = math.inf
+    if not math.isfinite(value):
+        raise RequestError(400, f"Riga {i}: il campo {field} deve essere un numero finito")
+
+    if field in FIELD_CODES:
+        if value not in FIELD_CODES[field]:
+            raise RequestError(400, f"Riga {i}: {field} deve essere uno tra {list(FIELD_CODES[field])}")
+    else:
+        lo, hi = FIELD_RANGES[field]
+        if not lo <= value <= hi:
+            raise RequestError(400, f"Riga {i}: {field} fuori intervallo [{lo}, {hi}]")
+    return value
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    timeout = REQUEST_TIMEOUT
+    disable_nagle_algorithm = True  # header e body in write separate: evita i 40 ms di delayed ACK
+
+    # Una richiesta per turno: tra un turno e l'altro la connessione keep-alive attende
+    # nel selector del server senza occupare un worker (vedi ScoringServer)
+    def handle(self):
+        self.handle_one_request()
+
+    def finish(self):
+        if self.close_connection:
+            super().finish()
+
+    def turn(self):
+        # Turno successivo sulla stessa connessione (il primo avviene nel costruttore)
+        try:
+            self.handle()
+        finally:
+            self.finish()
+
+    def pending(self):
+        # Byte della prossima richiesta già disponibili (nel buffer o sul socket)?
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        # Body non letto (header assente o non valido, troppo grande): la connessione
+        # non è più riutilizzabile e viene chiusa dopo la risposta
+        value = self.headers.get("Content-Length")
+        if value is None:
+            self.close_connection = True
+            raise RequestError(411, "Header Content-Length obbligatorio")
+        value = value.strip()
+        if not (value.isascii() and value.isdigit()):
+            self.close_connection = True
+            raise RequestError(400, "Content-Length non valido")
+        length = int(value)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise RequestError(413, f"Richiesta oltre {MAX_BODY_BYTES} byte")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            raise RequestError(400, "JSON non valido")
+
+    def _score(self, rows):
+        t = time.perf_counter()
+        columns = _columns(rows)
+        X = preprocess_batch(as_array=True, **columns)
+        proba, pred = self.server.engine.predict(X)
+        if self.server.store is not None:
+            # solo accodato: la scrittura avviene sul thread dello storico
+            self.server.store.record_many(self.client_address[0], columns, proba, pred,
+                                          self.server.version_label, (time.perf_counter() - t) * 1000)
+        return [{"proba": float(p), "pred": int(c)} for p, c in zip(proba, pred)]
+
+    def _fail(self):
+        # Errore inatteso: risposta JSON 500 invece della connessione chiusa senza risposta
+        logger.exception("Errore nella richiesta %s %s", self.command, self.path)
+        self._send_json(500, {"error": "Errore interno"})
+
+    def do_GET(self):
+        try:
+            self._get()
+        except Exception:
+            self._fail()
+
+    def _get(self):
+        if self.path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "uptime_s": round(time.time() - self.server.started, 1),
+                "model_version": self.server.version_tag,
+            })
+        else:
+            self._send_json(404, {"error": "Endpoint non trovato"})
+
+    def do_POST(self):
+        try:
+            # il body va sempre letto (o rifiutato) per poter riusare la connessione
+            payload = self._read_json()
+            if self.path == "/score":
+                if not isinstance(payload, dict):
+                    raise RequestError(400, "Atteso un oggetto JSON")
+                self._send_json(200, self._score([payload])[0])
+            elif self.path == "/score/batch":
+                rows = payload.get("rows") if isinstance(payload, dict) else payload
+                self._send_json(200, {"results": self._score(rows)})
+            else:
+                raise RequestError(404, "Endpoint non trovato")
+        except RequestError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception:
+            self._fail()
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class ScoringServer(HTTPServer):
+    # HTTPServer con pool di thread fisso che serve una richiesta alla volta: le
+    # connessioni in attesa (nuove o keep-alive inattive) stanno in un selector su un
+    # thread dedicato e tornano al pool solo quando arrivano dati. I worker limitano
+    # quindi le richieste in corso, non i client connessi; una connessione inattiva
+    # per più di KEEP_ALIVE_TIMEOUT viene chiusa. Modello e scaler caricati una sola volta.
+
+    def __init__(self, address, workers=8, artifact_path=ARTIFACT_PATH,
+                 model_path=MODEL_PATH, scaler_path=SCALER_PATH, history_path=None):
+        super().__init__(address, ScoringHandler)
+        self.engine, version = load_serving_engine(artifact_path, model_path, scaler_path)
+        self.version_tag = [v[1] for v in version]
+        self.version_label = version_label(version)
+        self.store = PredictionStore(history_path) if history_path else None
+        self.started = time.time()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring")
+
+        self._selector = selectors.DefaultSelector()
+        self._idle = {}  # socket -> (connessione, scadenza)
+        self._lock = threading.Lock()
+        self._closing = False
+        self._watcher = threading.Thread(target=self._watch, name="scoring-idle", daemon=True)
+        self._watcher.start()
+
+    def process_request(self, request, client_address):
+        # Nuova connessione: attende la prima richiesta senza occupare un worker
+        self._park(request, (request, client_address))
+
+    def _park(self, sock, conn):
+        with self._lock:
+            if self._closing:
+                self.shutdown_request(sock)
+                return
+            self._idle[sock] = (conn, time.monotonic() + KEEP_ALIVE_TIMEOUT)
+            self._selector.register(sock, selectors.EVENT_READ)
+
+    def _watch(self):
+        # Thread del selector: connessioni con dati -> pool; inattive oltre il limite -> chiuse
+        while not self._closing:
+            ready = self._selector.select(timeout=IDLE_CHECK_S)
+            now = time.monotonic()
+            with self._lock:
+                if self._closing:
+                    break
+                resumed, expired = [], []
+                for key, _ in ready:
+                    resumed.append(self._idle.pop(key.fileobj)[0])
+                    self._selector.unregister(key.fileobj)
+                for sock, (_, deadline) in list(self._idle.items()):
+                    if deadline < now:
+                        del self._idle[sock]
+                        self._selector.unregister(sock)
+                        expired.append(sock)
+            for conn in resumed:
+                self.pool.submit(self._turn, conn)
+            for sock in expired:
+                self.shutdown_request(sock)
+
+    def _turn(self, conn):
+        # Una richiesta; poi la connessione torna nel selector (o subito nel pool se
+        # il client ha già inviato la successiva) oppure viene chiusa
+        if isinstance(conn, ScoringHandler):
+            handler, (sock, client_address) = conn, (conn.request, conn.client_address)
+        else:
+            handler, (sock, client_address) = None, conn
+        try:
+            if handler is None:
+                handler = self.RequestHandlerClass(sock, client_address, self)
+            else:
+                handler.turn()
+            if handler.close_connection:
+                self.shutdown_request(sock)
+            elif handler.pending():
+                self.pool.submit(self._turn, handler)
+            else:
+                self._park(sock, handler)
+        except Exception:
+            self.handle_error(sock, client_address)
+            self.shutdown_request(sock)
+
+    def server_close(self):
+        super().server_close()
+        with self._lock:
+            self._closing = True
+            parked = list(self._idle)
+            self._idle.clear()
+        self._watcher.join()
+        for sock in parked:
+            self.shutdown_request(sock)
+        self._selector.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.store is not None:
+            self.store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servizio HTTP JSON di scoring del rischio cardiaco")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=8, help="richieste servite in parallelo (i client connessi non sono limitati)")
+    parser.add_argument("--history", default=None, help="database SQLite dello storico (disattivato se assente)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = ScoringServer((args.host, args.port), workers=args.workers, history_path=args.history)
+    logger.info("Scoring su http://%s:%d (%d worker)", args.host, args.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import os
+import sys
+import io
+import csv
+import json
+import time
+import sqlite3
+import threading
+from contextlib import closing
+import numpy as np
+
+from utilis.dataset import DATA_PATH, CACHE_DIR, DTYPES, CHUNK_ROWS, dataset_version, clean_chunk, _file_hash
+from utilis.data_cube import HIST_COLUMNS, FINE_BINS, CubeSlice, _bin_edges
+from utilis.bitmap_filter import CATEGORICAL, bmi_band, bp_band
+
+# Backend SQLite opzionale per la dashboard: il CSV viene caricato a blocchi in una
+# tabella indicizzata e filtri/aggregati diventano query con GROUP BY, così in Python
+# arrivano solo i risultati aggregati (la memoria non cresce con il numero di righe).
+#   CARDIO_DATA_BACKEND=sqlite streamlit run app/0_Home.py
+SQL_BACKEND = os.environ.get("CARDIO_DATA_BACKEND", "memory").lower() == "sqlite"
+
+INDEXED = ["gender", "age", "cholesterol", "gluc", "cardio"]
+BAND_COLUMNS = ["bmi_band", "bp_band"]  # derivate in fase di build, non esposte nella tabella
+FILTER_COLUMNS = CATEGORICAL + BAND_COLUMNS  # valori distinti salvati nei metadati
+CELL_COLUMNS = ["gender", "age", "cholesterol", "gluc", "cardio"]  # poche modalità: un solo GROUP BY
+VALUE_COLUMNS = ["BMI", "ap_hi"]  # un GROUP BY (valore, cardio) ciascuna
+TABLE = "patients"
+FORMAT_VERSION = 1
+MMAP_BYTES = 256 << 20
+
+
+def _covering(*first, extra=()):
+    # Indice coprente di una passata di aggregazione: prima le colonne del GROUP BY
+    # (gruppi letti in ordine, senza sort), poi tutte quelle dei filtri (nessun accesso
+    # alla tabella)
+    rest = [c for c in ["age"] + FILTER_COLUMNS if c not in first]
+    return [*first, *rest, *extra]
+
+
+COVERING = {"cells": _covering(*CELL_COLUMNS, extra=["BMI"]),
+            **{c: _covering(c, "cardio") for c in VALUE_COLUMNS}}
+
+
+def db_path(path=DATA_PATH, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.sqlite")
+
+
+def _read_meta(target):
+    try:
+        with closing(sqlite3.connect(f"file:{target}?mode=ro", uri=True)) as conn:
+            return json.loads(conn.execute("SELECT value FROM meta WHERE key = 'dataset'").fetchone()[0])
+    except (sqlite3.Error, TypeError, ValueError):
+        return None
+
+
+def _touch(path, target, signature):
+    # mtime cambiato (es. checkout git) ma stesso contenuto: aggiorna solo la firma nei
+    # metadati invece di ricostruire. True se il database esistente è stato riutilizzato
+    meta = _read_meta(target)
+    if meta is None or meta.get("format") != FORMAT_VERSION:
+        return False
+    if meta["size"] != signature[2] or meta["sha256"] != _file_hash(path):
+        return False
+    meta["mtime_ns"] = signature[1]
+    with closing(sqlite3.connect(target)) as conn, conn:
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'dataset'", (json.dumps(meta),))
+    return True
+
+
+def build_database(path=DATA_PATH, cache_dir=CACHE_DIR):
+    # CSV -> tabella SQLite letta a blocchi (stessa pulizia della cache NumPy),
+    # con le fasce BMI/pressione come colonne e indici sulle colonne dei filtri
+    import pandas as pd
+
+    target = db_path(path, cache_dir)
+    signature = dataset_version(path)
+    if _touch(path, target, signature):
+        return target
+
+    tmp = f"{target}.tmp-{os.getpid()}"
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    columns, bounds, values, n_rows = None, {}, {}, 0
+    with closing(sqlite3.connect(tmp)) as conn:
+        conn.execute("PRAGMA journal_mode=OFF")  # file temporaneo, sostituito a fine build
+        conn.execute("PRAGMA synchronous=OFF")
+        for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS):
+            chunk = clean_chunk(chunk)
+            chunk = chunk.astype({c: t for c, t in DTYPES.items() if c in chunk.columns})
+            chunk["bmi_band"] = bmi_band(chunk["BMI"])
+            chunk["bp_band"] = bp_band(chunk["ap_hi"], chunk["ap_lo"])
+
+            if columns is None:
+                columns = list(chunk.columns)
+                types = {c: "INTEGER" if np.issubdtype(chunk[c].dtype, np.integer) else "REAL" for c in columns}
+                conn.execute(f"CREATE TABLE {TABLE} ({', '.join(f'{c} {types[c]} NOT NULL' for c in columns)})")
+                insert = f"INSERT INTO {TABLE} VALUES ({', '.join('?' * len(columns))})"
+
+            conn.executemany(insert, chunk.itertuples(index=False, name=None))
+            n_rows += len(chunk)
+            for c in columns:
+                lo, hi = chunk[c].min(), chunk[c].max()
+                old = bounds.get(c, (lo, hi))
+                bounds[c] = (min(old[0], lo), max(old[1], hi))
+            for c in FILTER_COLUMNS:
+                values.setdefault(c, set()).update(np.unique(chunk[c]).tolist())
+
+        for c in INDEXED:
+            conn.execute(f"CREATE INDEX idx_{TABLE}_{c} ON {TABLE} ({c})")
+        for name, cols in COVERING.items():
+            conn.execute(f"CREATE INDEX idx_{TABLE}_{name}_cov ON {TABLE} ({', '.join(cols)})")
+        conn.execute("ANALYZE")  # statistiche per il planner: indice solo se selettivo
+
+        meta = {
+            "format": FORMAT_VERSION,
+            "source": os.path.abspath(path),
+            "mtime_ns": signature[1],
+            "size": signature[2],
+            "sha256": _file_hash(path),
+            "columns": [c for c in columns if c not in BAND_COLUMNS],
+            "rows": n_rows,
+            "bounds": {c: [lo.item(), hi.item(), types[c] == "INTEGER"] for c, (lo, hi) in bounds.items()},
+            "values": {c: sorted(v) for c, v in values.items()},
+        }
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT INTO meta VALUES ('dataset', ?)", (json.dumps(meta),))
+        conn.commit()
+
+    os.replace(tmp, target)
+    return target
+
+
+def _is_fresh(path, target):
+    # Solo lettura: firma (mtime, dimensione) del CSV uguale a quella dei metadati.
+    # Un mtime diverso con lo stesso contenuto è gestito da build_database (_touch)
+    meta = _read_meta(target)
+    if meta is None or meta.get("format") != FORMAT_VERSION:
+        return False
+    _, mtime_ns, size = dataset_version(path)
+    return meta["mtime_ns"] == mtime_ns and meta["size"] == size
+
+
+def load_database(path=DATA_PATH, cache_dir=CACHE_DIR):
+    # Database pronto per le query (ricostruito se il CSV è cambiato)
+    target = db_path(path, cache_dir)
+    if not _is_fresh(path, target):
+        build_database(path, cache_dir)
+    return SqlDataset(target)
+
+
+def _sum_by(keys, *weights):
+    # Somma dei pesi per chiave distinta: (chiavi ordinate, somme...)
+    keys, inv = np.unique(keys, return_inverse=True)
+    return (keys, *(np.bincount(inv, weights=w, minlength=len(keys)) for w in weights))
+
+
+class SqlSlice(CubeSlice):
+    # Stessa interfaccia di CubeSlice (KPI, istogrammi, incidenze) con gli aggregati
+    # calcolati dal database in tre passate, ognuna su un indice coprente: un GROUP BY
+    # sulle colonne con poche modalità e uno per ciascuna colonna continua, per valore
+    # distinto e cardio. Istogrammi (stessi bin fini del cubo) e boxplot derivano da
+    # questi conteggi.
+
+    def __init__(self, db, equals=None, ranges=None):
+        self.where = db.where(equals, ranges)
+        lo, hi = db.bounds["age"][:2]
+        age_range = (ranges or {}).get("age", (lo, hi))
+        self.ages = np.arange(max(lo, age_range[0]), min(hi, age_range[1]) + 1)
+
+        # Conteggi per valore distinto e cardio: {colonna: (valori, righe, casi cardio)}
+        self.counts = {}
+        cells = db.group_by(CELL_COLUMNS, self.where, sums=["BMI"], index="cells")
+        cells = dict(zip(CELL_COLUMNS + ["_n", "_BMI"], cells))
+        for col in CELL_COLUMNS:
+            self.counts[col] = (cells[col], cells["_n"], cells["cardio"] * cells["_n"])
+        for col in VALUE_COLUMNS:
+            values, cardio, n = db.group_by([col, "cardio"], self.where, index=col)
+            self.counts[col] = (values, n, cardio * n)
+
+        ages, count, cardio = _sum_by(*self.counts["age"])
+        a = (ages - self.ages[0]).astype(np.int64) if len(self.ages) else ages.astype(np.int64)
+        self.count_by_age = np.bincount(a, weights=count, minlength=len(self.ages))
+        self.cardio_by_age = np.bincount(a, weights=cardio, minlength=len(self.ages))
+        self.n = int(count.sum())
+        self._bmi_sum = cells["_BMI"].sum()
+
+        self.edges = {c: db.edges[c] for c in HIST_COLUMNS}
+
+    def _edges(self, col):
+        return self.edges[col]
+
+    def _hist(self, col):
+        # Valori distinti -> bin fini con la stessa regola del cubo
+        values, count, cardio = self.counts[col]
+        edges = self.edges[col]
+        nb = len(edges) - 1
+        b = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, nb - 1)
+        return np.bincount(b, weights=count, minlength=nb), np.bincount(b, weights=cardio, minlength=nb)
+
+    def _by_gender(self):
+        genders, count, cardio = _sum_by(*self.counts["gender"])
+        return genders.astype(np.int64), count, cardio
+
+    def box_counts(self, col):
+        # {cardio: (valori distinti, conteggi)} per box_stats_from_counts
+        values, count, cardio = self.counts[col]
+        return {0: _sum_by(values, count - cardio)[:2], 1: _sum_by(values, cardio)[:2]}
+
+
+class SqlRows:
+    # Righe selezionate come query (WHERE + ORDER BY), lette una pagina alla volta
+    def __init__(self, source, where, order_by, n):
+        self.source, self.where, self.order_by, self.n = source, where, order_by, n
+
+    def __len__(self):
+        return self.n
+
+
+class SqlDataset:
+    # Condiviso tra sessioni: una connessione in sola lettura per thread
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        meta = _read_meta(path)
+        self.columns = meta["columns"]
+        self.n = meta["rows"]
+        self.bounds = meta["bounds"]
+        self._values = meta["values"]
+        self.edges = {c: _bin_edges(*self.bounds[c], FINE_BINS) for c in HIST_COLUMNS}
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+        return conn
+
+    def query(self, sql, params=()):
+        return self._conn().execute(sql, params).fetchall()
+
+    def values(self, column):
+        return self._values[column]
+
+    def _check(self, column):
+        # I nomi di colonna finiscono nel testo SQL: solo colonne note
+        if column not in self.bounds:
+            raise ValueError(f"Colonna sconosciuta: {column}")
+
+    def where(self, equals=None, ranges=None):
+        # Filtri della dashboard -> (" WHERE ...", parametri), hashable per le cache.
+        # equals: {colonna: valori ammessi} (lista vuota = nessun vincolo); ranges: {colonna: (min, max)}
+        clauses, params = [], []
+        for column, values in (equals or {}).items():
+            if values:
+                self._check(column)
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        for column, (lo, hi) in (ranges or {}).items():
+            self._check(column)
+            if lo <= self.bounds[column][0] and hi >= self.bounds[column][1]:
+                continue  # intervallo che copre tutti i valori: nessun vincolo
+            clauses.append(f"{column} BETWEEN ? AND ?")
+            params.extend([lo, hi])
+        return (" WHERE " + " AND ".join(clauses) if clauses else "", tuple(params))
+
+    def group_by(self, columns, where=("", ()), sums=(), index=None):
+        # Un GROUP BY: colonne di raggruppamento, poi COUNT(*) e le SUM richieste,
+        # come array NumPy (in Python arrivano solo i gruppi). index: chiave di COVERING
+        # da imporre al planner, che con l'intervallo d'età sempre presente sceglierebbe
+        # idx_patients_age anche quando seleziona quasi tutte le righe
+        for c in (*columns, *sums):
+            self._check(c)
+        sql, params = where
+        source = f"{TABLE} INDEXED BY idx_{TABLE}_{index}_cov" if index else TABLE
+        rows = self.query(
+            f"SELECT {', '.join(columns)}, COUNT(*){''.join(f', SUM({c})' for c in sums)} "
+            f"FROM {source}{sql} GROUP BY {', '.join(columns)}", params)
+        return list(np.array(rows, dtype=np.float64).reshape(-1, len(columns) + 1 + len(sums)).T)
+
+    def select(self, equals=None, ranges=None):
+        return SqlSlice(self, equals, ranges)
+
+
+class SqlViewer:
+    # Stessa interfaccia di DataViewer: ordinamento e paginazione con ORDER BY / LIMIT
+    # (a parità di valore vince l'ordine delle righe, come l'argsort stabile)
+
+    def __init__(self, db):
+        self.db = db
+        self.columns = db.columns
+
+    def rows(self, selection, sort_by=None, descending=False):
+        # selection: SqlSlice dei filtri correnti (WHERE e numero di righe già noti)
+        direction = " DESC" if descending else ""
+        if sort_by is None:
+            # In ordine di rowid la scansione della tabella si ferma alla pagina richiesta;
+            # passando da un indice dei filtri servirebbe un sort di tutte le righe
+            return SqlRows(f"{TABLE} NOT INDEXED", selection.where, f"rowid{direction}", selection.n)
+        self.db._check(sort_by)
+        # rowid sempre crescente a parità di valore (ordinamento stabile anche in decrescente):
+        # in DESC SQLite ordina a parte ogni gruppo di valori uguali ("right part" dell'ORDER BY)
+        return SqlRows(TABLE, selection.where, f"{sort_by}{direction}, rowid", selection.n)
+
+    def n_pages(self, rows, page_size):
+        return max(1, -(-len(rows) // page_size))
+
+    def page(self, rows, page, page_size):
+        # DataFrame della sola pagina richiesta; indice = posizione della riga nel dataset
+        import pandas as pd
+
+        sql, params = rows.where
+        data = self.db.query(
+            f"SELECT rowid - 1, {', '.join(self.columns)} FROM {rows.source}{sql} ORDER BY {rows.order_by} LIMIT ? OFFSET ?",
+            params + (page_size, (page - 1) * page_size))
+        frame = pd.DataFrame.from_records(data, columns=["index"] + self.columns, index="index")
+        frame.index.name = None
+        return frame.astype({c: t for c, t in DTYPES.items() if c in frame.columns})
+
+    def export_csv(self, rows, chunk_rows=10_000):
+        # Bytes del CSV, come DataViewer.export_csv: costruito in memoria leggendo il
+        # cursore a blocchi
+        sql, params = rows.where
+        buf = io.BytesIO()
+        with closing(sqlite3.connect(f"file:{self.db.path}?mode=ro", uri=True)) as conn:
+            f = io.TextIOWrapper(buf, encoding="utf-8", newline="")
+            writer = csv.writer(f, lineterminator="\n")  # come DataFrame.to_csv
+            writer.writerow(self.columns)
+            cursor = conn.execute(
+                f"SELECT {', '.join(self.columns)} FROM {rows.source}{sql} ORDER BY {rows.order_by}", params)
+            while chunk := cursor.fetchmany(chunk_rows):
+                writer.writerows(chunk)
+            f.flush()
+            f.detach()
+        return buf.getvalue()
+
+
+# ------------------- Report tempi: memoria vs SQLite -------------------
+
+def report(path, cache_dir=CACHE_DIR):
+    from utilis.dataset import load_dataset
+    from utilis.data_cube import DataCube
+
+    target = db_path(path, cache_dir)
+    if os.path.exists(target):
+        os.remove(target)
+    t = time.perf_counter()
+    db = load_database(path, cache_dir)
+    build_s = time.perf_counter() - t
+
+    equals, ranges = {"gender": [2], "cholesterol": [2, 3]}, {"age": (40, 60)}
+    t = time.perf_counter()
+    sel = db.select(equals, ranges)
+    sql_s = time.perf_counter() - t
+
+    df = load_dataset(path, cache_dir)
+    t = time.perf_counter()
+    m = df["gender"].isin(equals["gender"]) & df["cholesterol"].isin(equals["cholesterol"]) & df["age"].between(*ranges["age"])
+    DataCube(df[m]).select()
+    memory_s = time.perf_counter() - t
+
+    print(f"{path}: {db.n} righe, database {os.path.getsize(target) / 1e6:.1f} MB ({sel.n} selezionate)")
+    print(f"  build SQLite + indici:      {build_s * 1000:9.1f} ms")
+    print(f"  aggregati SQL (GROUP BY):   {sql_s * 1000:9.1f} ms")
+    print(f"  aggregati in memoria:       {memory_s * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    # python -m utilis.sql_backend [path] [--rows N]
+    args = sys.argv[1:]
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if "--rows" in args:
+        i = args.index("--rows")
+        n_rows = int(args[i + 1])
+        del args[i:i + 2]
+        from utilis.synthetic import generate
+        path = generate(n_rows, os.path.join(CACHE_DIR, f"synthetic_{n_rows}.csv"))
+    else:
+        path = args[0] if args else DATA_PATH
+
+    report(path)
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utilis.dataset import DATA_PATH
+
+CATEGORICAL = ["gender", "cholesterol", "gluc", "smoke", "alco", "active", "cardio"]
+NUMERIC = ["age", "height", "weight", "ap_hi", "ap_lo"]
+INTEGER = {"age", "height", "ap_hi", "ap_lo"}
+COLUMNS = ["id", "age", "gender", "height", "weight", "ap_hi", "ap_lo",
+           "cholesterol", "gluc", "smoke", "alco", "active", "cardio", "BMI"]
+
+# Gruppi per le distribuzioni numeriche condizionate (fallback se troppo piccoli)
+GROUP_KEYS = [["gender", "cardio", "cholesterol"], ["gender", "cardio"], []]
+MIN_GROUP_ROWS = 200
+QUANTILE_POINTS = 1025
+CHUNK_ROWS = 500_000
+
+
+def _norm_cdf(z):
+    # Φ(z) tramite l'approssimazione di erf di Abramowitz-Stegun 7.1.26 (errore < 1.5e-7)
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return 0.5 * (1 + np.sign(z) * erf)
+
+
+class CohortModel:
+    # Modello generativo appreso da cardio_db.csv:
+    # - distribuzione congiunta empirica delle variabili categoriche (inclusa cardio);
+    # - per gruppo (genere, cardio, colesterolo) una copula gaussiana sulle numeriche:
+    #   marginali empiriche (griglia di quantili) + correlazione tra ranghi.
+
+    def fit(self, df):
+        combos = df.groupby(CATEGORICAL).size()
+        self.combos = np.array(combos.index.tolist(), dtype=np.int64)
+        self.combo_p = combos.to_numpy() / combos.sum()
+
+        grid = np.linspace(0, 1, QUANTILE_POINTS)
+        self.grid = grid
+        self.groups = {}
+        for keys in GROUP_KEYS:
+            parts = df.groupby(keys) if keys else [((), df)]
+            for key, part in parts:
+                if len(part) < MIN_GROUP_ROWS:
+                    continue
+                key = key if isinstance(key, tuple) else (key,)
+                rho_s = part[NUMERIC].rank().corr().to_numpy()
+                corr = 2 * np.sin(np.pi * rho_s / 6)  # Spearman -> Pearson per la copula gaussiana
+                w, v = np.linalg.eigh(corr)
+                corr = (v * np.clip(w, 1e-6, None)) @ v.T
+                self.groups[(tuple(keys), key)] = {
+                    "chol": np.linalg.cholesky(corr),
+                    "quantiles": np.quantile(part[NUMERIC].to_numpy(np.float64), grid, axis=0),
+                }
+        return self
+
+    def _group_for(self, combo):
+        values = dict(zip(CATEGORICAL, combo))
+        for keys in GROUP_KEYS:
+            g = self.groups.get((tuple(keys), tuple(values[k] for k in keys)))
+            if g is not None:
+                return g
+        raise KeyError(combo)
+
+    def sample(self, n, rng, start_id=0):
+        # n righe sintetiche con le stesse colonne di cardio_db.csv
+        idx = rng.choice(len(self.combos), size=n, p=self.combo_p)
+        cats = self.combos[idx]
+        nums = np.empty((n, len(NUMERIC)))
+
+        for c in np.unique(idx):
+            rows = np.flatnonzero(idx == c)
+            g = self._group_for(self.combos[c])
+            z = rng.standard_normal((len(rows), len(NUMERIC))) @ g["chol"].T
+            u = _norm_cdf(z)
+            for j in range(len(NUMERIC)):
+                nums[rows, j] = np.interp(u[:, j], self.grid, g["quantiles"][:, j])
+
+        out = {"id": np.arange(start_id, start_id + n)}
+        for j, col in enumerate(NUMERIC):
+            out[col] = np.rint(nums[:, j]).astype(np.int64) if col in INTEGER else np.round(nums[:, j], 1)
+        for j, col in enumerate(CATEGORICAL):
+            out[col] = cats[:, j]
+        out["BMI"] = out["weight"] / ((out["height"] / 100) ** 2)
+        return pd.DataFrame(out)[COLUMNS]
+
+
+# ------------------- Generazione a blocchi -------------------
+
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _chunk_csv(args):
+    # Un blocco: seme derivato dall'indice, quindi riproducibile con qualsiasi numero di processi
+    index, n, start_id, seed_seq = args
+    rng = np.random.default_rng(seed_seq)
+    return index, _worker_model.sample(n, rng, start_id).to_csv(index=False, header=False)
+
+
+def _tasks(n_rows, chunk_rows, seed):
+    n_chunks = -(-n_rows // chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i in range(n_chunks):
+        start = i * chunk_rows
+        yield i, min(chunk_rows, n_rows - start), start, seeds[i]
+
+
+def generate(n_rows, out_path, source=DATA_PATH, seed=0, chunk_rows=CHUNK_ROWS, workers=1, model=None):
+    # Scrive n_rows righe sintetiche su disco a blocchi di chunk_rows (memoria limitata)
+    if model is None:
+        from utilis.dataset import load_dataset
+        model = CohortModel().fit(load_dataset(source))
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        if workers <= 1:
+            _init_worker(model)
+            for task in _tasks(n_rows, chunk_rows, seed):
+                f.write(_chunk_csv(task)[1])
+        else:
+            # al massimo 2 blocchi in volo per worker, scritti nell'ordine originale
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model,)) as pool:
+                pending = {}
+                next_index = 0
+                tasks = _tasks(n_rows, chunk_rows, seed)
+                for task in tasks:
+                    pending[task[0]] = pool.submit(_chunk_csv, task)
+                    while len(pending) >= 2 * workers:
+                        f.write(pending.pop(next_index).result()[1])
+                        next_index += 1
+                while pending:
+                    f.write(pending.pop(next_index).result()[1])
+                    next_index += 1
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generatore di coorti sintetiche con la struttura di cardio_db.csv")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--source", default=DATA_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    generate(args.rows, args.out, args.source, args.seed, args.chunk_rows, args.workers)
+    elapsed = time.perf_counter() - t
+    print(f"{args.rows} righe in {args.out} ({elapsed:.1f} s, {args.rows / elapsed:,.0f} righe/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
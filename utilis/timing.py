@@ -0,0 +1,106 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+WINDOW = 1000  # campioni mantenuti per stage (finestra mobile)
+PERCENTILES = (50, 95, 99)
+
+logger = logging.getLogger("cardio.timing")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class LatencyRecorder:
+    # Finestre mobili di durate per stage, condivise da tutte le sessioni del processo
+
+    def __init__(self, name, window=WINDOW):
+        self.name = name
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def start(self):
+        return RequestTimer(self)
+
+    @contextmanager
+    def timed(self, stage):
+        # Durata di un blocco registrata direttamente (es. un fragment rieseguito da solo)
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t)
+
+    def summary(self):
+        # {stage: {"count": n, "p50": ms, "p95": ms, "p99": ms}}
+        with self._lock:
+            snapshot = {s: np.fromiter(v, dtype=np.float64) for s, v in self._samples.items()}
+
+        out = {}
+        for stage, values in snapshot.items():
+            row = {"count": len(values)}
+            for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES) * 1000):
+                row[f"p{p}"] = float(v)
+            out[stage] = row
+        return out
+
+
+class RequestTimer:
+    # Durate degli stage di una singola richiesta (perf_counter)
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.timings = {}
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def finish(self, **extra):
+        # Registra gli stage nelle finestre mobili ed emette una riga di log JSON
+        self.timings["total"] = time.perf_counter() - self._t0
+        for stage, seconds in self.timings.items():
+            self.recorder.record(stage, seconds)
+
+        logger.info(json.dumps({
+            "event": "timing",
+            "flow": self.recorder.name,
+            **{f"{s}_ms": round(v * 1000, 4) for s, v in self.timings.items()},
+            **extra,
+        }))
+        return self.timings
+
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def get_recorder(name):
+    # Un recorder per flusso, unico per processo
+    with _recorders_lock:
+        if name not in _recorders:
+            _recorders[name] = LatencyRecorder(name)
+        return _recorders[name]
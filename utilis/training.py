@@ -0,0 +1,135 @@
+import os
+import json
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+from utilis.feature_preprocessing import FEATURES
+from utilis.etl import MODEL_DATA_PATH
+from utilis.inference import MODEL_PATH, SCALER_PATH
+from utilis.artifact import ARTIFACT_PATH, export_artifact
+
+TARGET = "cardio"
+CHUNK_ROWS = 100_000
+TEST_MOD = 5          # id % 5 == 0 -> holdout (20%), deterministico e valutabile a blocchi
+EPOCHS = 5
+ALPHA = 1e-5
+ETA0 = 0.001          # passo costante + media dei pesi (averaged SGD)
+AUC_BINS = 1000
+
+
+def _chunks(path, chunk_rows):
+    cols = ["id"] + FEATURES + [TARGET]
+    for chunk in pd.read_csv(path, usecols=cols, chunksize=chunk_rows):
+        test = (chunk["id"].to_numpy() % TEST_MOD) == 0
+        X = chunk[FEATURES].to_numpy(dtype=np.float64)
+        y = chunk[TARGET].to_numpy()
+        yield X[~test], y[~test], X[test], y[test]
+
+
+def fit_streaming(path=MODEL_DATA_PATH, chunk_rows=CHUNK_ROWS, epochs=EPOCHS, alpha=ALPHA, eta0=ETA0, seed=42):
+    # Scaler con media/varianza incrementali (passata 1) e regressione logistica
+    # via SGD a mini-batch (passate successive): memoria limitata a un blocco.
+    scaler = StandardScaler()
+    for X, _, _, _ in _chunks(path, chunk_rows):
+        if len(X):
+            scaler.partial_fit(pd.DataFrame(X, columns=FEATURES))
+
+    model = SGDClassifier(loss="log_loss", alpha=alpha, learning_rate="constant", eta0=eta0,
+                          average=True, random_state=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        for X, y, _, _ in _chunks(path, chunk_rows):
+            if not len(X):
+                continue
+            order = rng.permutation(len(X))
+            X_scaled = scaler.transform(pd.DataFrame(X[order], columns=FEATURES))
+            model.partial_fit(X_scaled, y[order], classes=np.array([0, 1]))
+    return model, scaler
+
+
+def fit_exact(path=MODEL_DATA_PATH):
+    # Stesso fit in memoria di model/train_model.ipynb (per dataset piccoli), ma sullo
+    # split id % 5 dello streaming: le metriche di evaluate() sono confrontabili
+    df = pd.read_csv(path, usecols=["id"] + FEATURES + [TARGET])
+    train = (df["id"].to_numpy() % TEST_MOD) != 0
+    X_train, y_train = df.loc[train, FEATURES], df.loc[train, TARGET]
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    model = LogisticRegression(max_iter=1000, random_state=42)
+    model.fit(X_train_scaled, y_train)
+    return model, scaler
+
+
+def evaluate(model, scaler, path=MODEL_DATA_PATH, chunk_rows=CHUNK_ROWS):
+    # Accuratezza, log-loss e ROC AUC (da istogramma delle probabilità) sull'holdout, a blocchi
+    n = correct = 0
+    loss = 0.0
+    pos = np.zeros(AUC_BINS)
+    neg = np.zeros(AUC_BINS)
+    for _, _, X, y in _chunks(path, chunk_rows):
+        if not len(X):
+            continue
+        p = model.predict_proba(scaler.transform(pd.DataFrame(X, columns=FEATURES)))[:, 1]
+        p = np.clip(p, 1e-12, 1 - 1e-12)
+        n += len(y)
+        correct += int(((p > 0.5) == (y == 1)).sum())
+        loss -= float(np.sum(y * np.log(p) + (1 - y) * np.log(1 - p)))
+        b = np.minimum((p * AUC_BINS).astype(int), AUC_BINS - 1)
+        pos += np.bincount(b[y == 1], minlength=AUC_BINS)
+        neg += np.bincount(b[y == 0], minlength=AUC_BINS)
+
+    # AUC = P(score positivo > score negativo), pareggi nello stesso bin contati a metà
+    neg_below = np.cumsum(neg) - neg
+    auc = float((pos * (neg_below + neg / 2)).sum() / (pos.sum() * neg.sum())) if n else np.nan
+    return {"rows": n, "accuracy": correct / n if n else np.nan,
+            "log_loss": loss / n if n else np.nan, "roc_auc": auc}
+
+
+def save(model, scaler, model_path, scaler_path, artifact_path):
+    # Percorsi sempre espliciti: model/*.pkl e model/model.npz sono versionati.
+    # Stessa interfaccia letta dalla pagina Predizione (coef_, intercept_, mean_, scale_),
+    # più l'artefatto .npz servito senza sklearn
+    for obj, path in ((model, model_path), (scaler, scaler_path)):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(obj, f)
+        os.replace(tmp, path)
+    if artifact_path:
+        export_artifact(model, scaler, artifact_path, sources=(model_path, scaler_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Addestramento out-of-core di scaler + regressione logistica")
+    parser.add_argument("--data", default=MODEL_DATA_PATH, help="dataset one-hot prodotto da utilis.etl")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--eta0", type=float, default=ETA0)
+    parser.add_argument("--exact", action="store_true",
+                        help="fit in memoria identico al notebook (solo dataset piccoli)")
+    parser.add_argument("--model-out", required=True, help=f"pickle del modello ({MODEL_PATH} è versionato)")
+    parser.add_argument("--scaler-out", required=True, help=f"pickle dello scaler ({SCALER_PATH} è versionato)")
+    parser.add_argument("--artifact-out", required=True,
+                        help=f"artefatto .npz ({ARTIFACT_PATH} è versionato), '' per non esportarlo")
+    parser.add_argument("--dry-run", action="store_true", help="valuta senza salvare gli artefatti")
+    args = parser.parse_args()
+
+    if args.exact:
+        model, scaler = fit_exact(args.data)
+    else:
+        model, scaler = fit_streaming(args.data, args.chunk_rows, args.epochs, args.alpha, args.eta0)
+    metrics = evaluate(model, scaler, args.data, args.chunk_rows)
+
+    print(json.dumps(metrics, indent=2))
+    if not args.dry_run:
+        save(model, scaler, args.model_out, args.scaler_out, args.artifact_out)
+        print(f"Salvati {args.model_out}, {args.scaler_out} e {args.artifact_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import numpy as np
+
+from utilis.feature_preprocessing import RAW_FIELDS, preprocess_batch
+
+# Scenari "what-if": griglie controfattuali attorno ai valori di un paziente,
+# valutate tutte insieme in un unico passaggio vettorizzato del motore
+
+# Stessi limiti degli input della pagina Predizione
+WEIGHT_RANGE = (40, 200)
+AP_HI_RANGE = (80, 250)
+
+
+def scenarios(base, **axes):
+    # Prodotto cartesiano degli assi indicati; gli altri campi restano fissi al valore
+    # del paziente. Restituisce (campi come array piatti, forma della griglia).
+    grids = np.meshgrid(*(np.asarray(v, dtype=np.float64) for v in axes.values()), indexing="ij")
+    n = grids[0].size
+    fields = {c: np.full(n, float(base[c])) for c in RAW_FIELDS}
+    for c, g in zip(axes, grids):
+        fields[c] = g.ravel()
+    return fields, grids[0].shape
+
+
+def score_scenarios(engine, *grids):
+    # Un solo preprocess_batch + predict per tutte le griglie; probabilità
+    # restituite nella forma di ciascuna griglia (BMI ricalcolato dal peso)
+    fields = {c: np.concatenate([f[c] for f, _ in grids]) for c in RAW_FIELDS}
+    proba, _ = engine.predict(preprocess_batch(as_array=True, **fields))
+
+    out, start = [], 0
+    for _, shape in grids:
+        n = int(np.prod(shape))
+        out.append(proba[start:start + n].reshape(shape))
+        start += n
+    return out